@@ -0,0 +1,318 @@
+"""End-to-end benchmark of the text service API on a seeded database with the fake LLM backend.
+
+Run with: `python backend/benchmarks/bench_api.py [--users 100] [--records-per-user 20] [--requests 200] [--concurrency 8]`
+
+시드 데이터는 임시 디렉터리의 별도 DB(RECORDS_DB_PATH)와 PDF 캐시에 만들고, 서버 앱은 httpx의
+ASGI 전송으로 같은 프로세스에서 호출한다. Gemini는 LLM_BACKEND=fake로 대체되며 지연은
+FAKE_LLM_LATENCY_MS 등으로 조정한다(기본 50ms, 속도 제한 없음).
+결과는 `backend/benchmarks/results/<commit>.json`에 저장되고 `--baseline 파일`로 이전 결과와 비교한다.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+DEFAULT_RESULTS_DIR = BENCH_DIR / "results"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+SENTENCES = [
+    "Heavy rain hit the city overnight and several roads were closed.",
+    "The council said it would review the drainage system next month.",
+    "Local shops reported fewer customers during the storm.",
+    "Volunteers helped residents move furniture to higher floors.",
+    "Experts warned that extreme weather is becoming more common.",
+    "I think the city should invest more in flood prevention.",
+    "In my opinion, the response from the government was too slow.",
+    "Many students could not attend classes because of the flooding.",
+]
+
+
+def _prepare_env(workdir: Path, concurrency: int) -> None:
+    """서버 모듈을 임포트하기 전에 설정을 고정한다. 이미 지정된 환경 변수는 그대로 둔다."""
+    os.environ["RECORDS_DB_PATH"] = str(workdir / "records.db")
+    os.environ["PDF_CACHE_DIR"] = str(workdir / "pdf_cache")
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ.setdefault("TRACE_LOG", "0")  # 요청마다 출력되는 JSON 트레이스가 측정을 방해하지 않게
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", "50")
+    os.environ.setdefault("LLM_RATE_PER_SEC", "0")
+    os.environ.setdefault("LLM_INITIAL_CONCURRENCY", str(max(4, concurrency)))
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(max(16, concurrency * 2)))
+    # 대기열이 동시 요청 수보다 작으면 렌더 시간 대신 503 거절을 재게 된다.
+    os.environ.setdefault("PDF_RENDER_MAX_PENDING", str(max(8, concurrency * 2)))
+
+
+def _paragraph(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(SENTENCES) for _ in range(count))
+
+
+def seed_database(records, auth, users: int, per_user: int, seed: int) -> Dict[str, Any]:
+    """사용자, 질문/토론/레벨 테스트 기록, 오늘의 목표를 만든다."""
+    rng = random.Random(seed)
+    password_hash = auth.get_password_hash("benchmark-password")
+    today = date.today()
+    user_ids: List[str] = []
+    record_ids: List[str] = []
+    for idx in range(users):
+        user = records.create_user(f"bench{idx:05d}", f"벤치{idx}", password_hash)
+        user_ids.append(user["id"])
+        records.upsert_daily_goal(user["id"], today.isoformat(), rng.randint(1, 10), rng.randint(0, 3))
+        for jdx in range(per_user):
+            # 기록의 일부는 오늘 날짜로 만들어 일일 목표 진행도 계산에 걸리게 한다.
+            day = today if jdx % 5 == 0 else today - timedelta(days=rng.randint(1, 59))
+            created_at = f"{day.isoformat()}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00Z"
+            kind = rng.choices(("questions", "discussion", "level_test"), weights=(6, 3, 1))[0]
+            evaluation = None
+            if kind == "questions":
+                payload = {
+                    "items": [
+                        {"question": f"Question {n + 1}: {rng.choice(SENTENCES)}", "answer": _paragraph(rng, 2)}
+                        for n in range(5)
+                    ],
+                    "source_text": _paragraph(rng, 12),
+                }
+            elif kind == "discussion":
+                history = []
+                for turn in range(4):
+                    history.append({"role": "ai", "content": f"Follow-up {turn + 1}: {rng.choice(SENTENCES)}"})
+                    history.append({"role": "user", "content": _paragraph(rng, 2)})
+                payload = {"history": history, "initial_questions": [history[0]["content"]], "source_text": _paragraph(rng, 12)}
+            else:
+                percentage = round(rng.uniform(20, 100), 1)
+                payload = {"responses": [{"question_id": f"q{n}", "answer": rng.choice("ABCD")} for n in range(25)]}
+                evaluation = {"percentage": percentage, "level": "B1", "feedback": {"summary": "벤치마크 결과"}}
+            record = records.save_record(
+                kind,
+                payload,
+                meta={"title": f"{kind} #{jdx}", "topics": ["weather", "city"]},
+                evaluation=evaluation,
+                user_id=user["id"],
+                created_at=created_at,
+                date=day.isoformat(),
+            )
+            record_ids.append(record["id"])
+    tokens = {user_id: auth.create_access_token({"sub": user_id}) for user_id in user_ids}
+    return {"user_ids": user_ids, "record_ids": record_ids, "tokens": tokens}
+
+
+# --- 시나리오 ---
+async def _request(client, method: str, url: str, *, token: Optional[str] = None, body: Any = None):
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    response = await client.request(method, url, headers=headers, json=body)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} -> {response.status_code}")
+    return response
+
+
+def _token(ctx: Dict[str, Any], rng: random.Random) -> str:
+    return ctx["tokens"][rng.choice(ctx["user_ids"])]
+
+
+async def records_list(client, ctx, rng):
+    await _request(client, "GET", "/records")
+
+
+async def me_records(client, ctx, rng):
+    await _request(client, "GET", "/me/records", token=_token(ctx, rng))
+
+
+async def rankings(client, ctx, rng):
+    await _request(client, "GET", "/rankings")
+
+
+async def me_rankings(client, ctx, rng):
+    await _request(client, "GET", "/me/rankings", token=_token(ctx, rng))
+
+
+async def me_daily_goal(client, ctx, rng):
+    await _request(client, "GET", "/me/daily-goal", token=_token(ctx, rng))
+
+
+async def record_pdf(client, ctx, rng):
+    # 일부 기록만 골라 첫 요청(렌더링)과 이후 요청(캐시)이 섞이게 한다.
+    record_id = rng.choice(ctx["record_ids"][:50])
+    await _request(client, "GET", f"/records/{record_id}.pdf")
+
+
+async def chat_flow(client, ctx, rng):
+    token = _token(ctx, rng)
+    started = await _request(client, "POST", "/chat/start", token=token, body={"text": _paragraph(rng, 10), "max_questions": 4})
+    session_id = started.json()["session_id"]
+    for _ in range(2):
+        await _request(client, "POST", "/chat/reply", body={"session_id": session_id, "answer": _paragraph(rng, 2)})
+    await _request(client, "POST", "/chat/end", body={"session_id": session_id})
+
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[None]]] = {
+    "records_list": records_list,
+    "me_records": me_records,
+    "rankings": rankings,
+    "me_rankings": me_rankings,
+    "me_daily_goal": me_daily_goal,
+    "record_pdf": record_pdf,
+    "chat_flow": chat_flow,
+}
+
+
+async def run_scenario(client, metrics, name: str, ctx: Dict[str, Any], requests: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    scenario = SCENARIOS[name]
+    window = metrics.LatencyWindow(size=max(1, requests))
+    rng = random.Random(f"{seed}:{name}")
+    jobs = iter(range(requests))
+    errors: List[str] = []
+
+    async def worker() -> None:
+        for _ in jobs:  # 워커들이 같은 이터레이터를 나눠 소비한다
+            started = time.perf_counter()
+            try:
+                await scenario(client, ctx, rng)
+            except Exception as exc:
+                errors.append(str(exc))
+                continue
+            window.observe(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": name,
+        "requests": requests,
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "rps": round((requests - len(errors)) / elapsed, 2) if elapsed else 0.0,
+        **window.percentiles(),
+        **({"first_error": errors[0]} if errors else {}),
+    }
+
+
+async def run_all(args: argparse.Namespace, ctx: Dict[str, Any], server, metrics) -> List[Dict[str, Any]]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=server.app)
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for name in args.scenarios:
+                if args.warmup:
+                    await run_scenario(client, metrics, name, ctx, args.warmup, 1, args.seed + 1)
+                result = await run_scenario(client, metrics, name, ctx, args.requests, args.concurrency, args.seed)
+                results.append(result)
+                print(_format_row(result), flush=True)
+    finally:
+        await server._shutdown_workers()
+    return results
+
+
+# --- 결과 저장/비교 ---
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+HEADER = f"{'scenario':<16}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    return f"{row['scenario']:<16}{row['rps']:>9}{str(row['p50_ms']):>10}{str(row['p95_ms']):>10}{str(row['p99_ms']):>10}{row['errors']:>8}"
+
+
+def save_results(results: List[Dict[str, Any]], args: argparse.Namespace, seed_seconds: float) -> Path:
+    commit = _git_commit()
+    args.output.mkdir(parents=True, exist_ok=True)
+    path = args.output / f"{commit}.json"
+    payload = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+        "python": sys.version.split()[0],
+        "params": {
+            "users": args.users,
+            "records_per_user": args.records_per_user,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "fake_llm_latency_ms": os.environ.get("FAKE_LLM_LATENCY_MS"),
+        },
+        "seed_seconds": round(seed_seconds, 2),
+        "scenarios": results,
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def compare(baseline_path: Path, results: List[Dict[str, Any]]) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {row["scenario"]: row for row in baseline.get("scenarios", [])}
+    print(f"\n기준 결과 {baseline.get('commit')} 대비 (음수가 개선)")
+    print(f"{'scenario':<16}{'rps Δ%':>9}{'p50 Δ%':>10}{'p95 Δ%':>10}{'p99 Δ%':>10}")
+
+    def delta(key: str, row: Dict[str, Any], old: Dict[str, Any], invert: bool = False) -> str:
+        if not old.get(key) or row.get(key) is None:
+            return "-"
+        change = (row[key] - old[key]) / old[key] * 100
+        return f"{-change if invert else change:+.1f}"
+
+    for row in results:
+        old = previous.get(row["scenario"])
+        if not old:
+            continue
+        print(
+            f"{row['scenario']:<16}{delta('rps', row, old, invert=True):>9}{delta('p50_ms', row, old):>10}"
+            f"{delta('p95_ms', row, old):>10}{delta('p99_ms', row, old):>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--records-per-user", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="시나리오별 요청(흐름) 수")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", type=Path, default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--baseline", type=Path, help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="chatterpals-bench-") as workdir:
+        _prepare_env(Path(workdir), args.concurrency)
+        records = importlib.import_module("service-text.records")
+        auth = importlib.import_module("service-text.auth")
+        metrics = importlib.import_module("service-text.metrics")
+        server = importlib.import_module("service-text.server")
+
+        started = time.perf_counter()
+        ctx = seed_database(records, auth, args.users, args.records_per_user, args.seed)
+        seed_seconds = time.perf_counter() - started
+        print(f"시드: 사용자 {len(ctx['user_ids'])}명, 기록 {len(ctx['record_ids'])}건 ({seed_seconds:.1f}s)")
+        print(HEADER)
+        print("-" * len(HEADER))
+        results = asyncio.run(run_all(args, ctx, server, metrics))
+
+    path = save_results(results, args, seed_seconds)
+    print(f"\n결과 저장: {path}")
+    if args.baseline:
+        compare(args.baseline, results)
+
+
+if __name__ == "__main__":
+    main()
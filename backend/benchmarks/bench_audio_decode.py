@@ -0,0 +1,128 @@
+"""Latency and CPU per request for the in-process WAV path versus the ffmpeg subprocess.
+
+Run with: `python backend/benchmarks/bench_audio_decode.py [--durations 5 30] [--repeat 20]`
+
+Synthetic speech-band WAV clips are generated in common client formats and converted to
+16 kHz mono PCM16 by `wav.decode_wav` (service-voice/wav.py) and by the same ffmpeg command
+the voice server runs. CPU time is the process CPU for the fast path and the children's
+CPU (fork + ffmpeg) for the subprocess path. The ffmpeg rows are skipped when ffmpeg is missing.
+"""
+
+import argparse
+import importlib
+import os
+import resource
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+wav = importlib.import_module("service-voice.wav")
+
+# (이름, 샘플레이트, 채널, 포맷 코드, 비트 수)
+FORMATS: List[Tuple[str, int, int, int, int]] = [
+    ("16k mono s16", 16000, 1, wav.WAVE_FORMAT_PCM, 16),
+    ("48k stereo s16", 48000, 2, wav.WAVE_FORMAT_PCM, 16),
+    ("44.1k mono f32", 44100, 1, wav.WAVE_FORMAT_IEEE_FLOAT, 32),
+]
+
+
+def make_clip(rate: int, channels: int, audio_format: int, bits: int, seconds: float, seed: int = 0) -> bytes:
+    """여러 음성 대역 사인파와 약한 잡음을 섞은 WAV를 만든다."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    signal = sum(0.2 * np.sin(2 * np.pi * f * t) for f in (180, 420, 1100, 2600))
+    signal = signal + 0.02 * rng.standard_normal(len(t))
+    frames = np.repeat(signal[:, None], channels, axis=1)
+    if audio_format == wav.WAVE_FORMAT_IEEE_FLOAT:
+        data = frames.astype("<f4").tobytes()
+    else:
+        data = np.clip(frames * 32767, -32768, 32767).astype("<i2").tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(data), b"WAVE",
+        b"fmt ", 16, audio_format, channels, rate, rate * channels * bits // 8, channels * bits // 8, bits,
+        b"data", len(data),
+    )
+    return header + data
+
+
+def _ffmpeg_runner(ffmpeg: str) -> Callable[[bytes], bytes]:
+    command = [
+        ffmpeg, '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0', '-acodec', 'pcm_s16le',
+        '-ar', '16000', '-ac', '1', '-f', 'wav', 'pipe:1'
+    ]
+
+    def run(data: bytes) -> bytes:
+        return subprocess.run(command, input=data, capture_output=True, check=True).stdout
+
+    return run
+
+
+def _cpu_seconds(children: bool) -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(convert: Callable[[bytes], Optional[bytes]], data: bytes, repeat: int, children: bool) -> Dict[str, float]:
+    convert(data)  # 워밍업
+    latencies: List[float] = []
+    cpu_before = _cpu_seconds(children)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if convert(data) is None:
+            raise SystemExit("빠른 경로가 입력을 처리하지 못했습니다.")
+        latencies.append(time.perf_counter() - started)
+    cpu = _cpu_seconds(children) - cpu_before
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "cpu_ms": cpu / repeat * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--durations", type=float, nargs="+", default=[5.0, 30.0], help="클립 길이(초)")
+    parser.add_argument("--repeat", type=int, default=20, help="입력별 반복 횟수")
+    parser.add_argument("--ffmpeg", default=os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg"))
+    args = parser.parse_args()
+
+    paths: List[Tuple[str, Callable[[bytes], Optional[bytes]], bool]] = [("wav_fast", wav.decode_wav, False)]
+    if args.ffmpeg:
+        paths.append(("ffmpeg", _ffmpeg_runner(args.ffmpeg), True))
+    else:
+        print("ffmpeg를 찾을 수 없어 ffmpeg 경로는 건너뜁니다. (--ffmpeg로 지정)\n")
+    if wav.np is None:
+        print("NumPy가 없어 16k mono s16 이외의 입력은 빠른 경로가 처리하지 못합니다.\n")
+
+    header = f"{'input':<16}{'sec':>6}{'path':>10}{'p50 ms':>10}{'p95 ms':>10}{'cpu ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, rate, channels, audio_format, bits in FORMATS:
+        for seconds in args.durations:
+            data = make_clip(rate, channels, audio_format, bits, seconds)
+            for path, convert, children in paths:
+                result = measure(convert, data, args.repeat, children)
+                print(
+                    f"{name:<16}{seconds:>6g}{path:>10}"
+                    f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['cpu_ms']:>10.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark article text extraction: readability + BeautifulSoup vs. the single-pass lxml path.
+
+Run with: `python backend/benchmarks/bench_extract.py [--iterations 20] [--workers 4]`
+
+Each implementation runs in a fresh subprocess so peak memory (ru_maxrss and the
+tracemalloc peak of Python allocations) is not polluted by the other run.
+Add saved pages to `backend/benchmarks/corpus/` (or pass `--corpus DIR`) to widen the corpus.
+"""
+
+import argparse
+import importlib
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+DEFAULT_CORPUS = BENCH_DIR / "corpus"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+extract = importlib.import_module("service-text.extract")
+
+
+def legacy_parse(html: str) -> Tuple[str, str]:
+    """변경 전 구현: readability 요약 HTML을 BeautifulSoup으로 다시 파싱한다."""
+    from bs4 import BeautifulSoup
+    from readability import Document
+
+    doc = Document(html)
+    title = doc.title()
+    soup = BeautifulSoup(doc.summary(), "lxml")
+    return soup.get_text(separator="\n", strip=True), title
+
+
+IMPLEMENTATIONS = {
+    "legacy": legacy_parse,
+    "fast": extract._parse_article,
+}
+
+
+def load_corpus(corpus_dir: Path) -> List[str]:
+    pages = [path.read_text(encoding="utf-8", errors="replace") for path in sorted(corpus_dir.glob("*.htm*"))]
+    if not pages:
+        raise SystemExit(f"코퍼스가 비어 있습니다: {corpus_dir}")
+    return pages
+
+
+def run_single(impl: str, pages: List[str], iterations: int) -> Dict[str, float]:
+    parse = IMPLEMENTATIONS[impl]
+    parse(pages[0])  # 임포트와 lxml 초기화 비용은 측정에서 제외
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for page in pages:
+            parse(page)
+    elapsed = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = iterations * len(pages)
+    return {
+        "impl": impl,
+        "pages": total,
+        "seconds": round(elapsed, 4),
+        "pages_per_sec": round(total / elapsed, 2) if elapsed else 0.0,
+        "tracemalloc_peak_kb": round(peak / 1024, 1),
+        "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_pool(pages: List[str], iterations: int, workers: int) -> Dict[str, float]:
+    jobs = [page for _ in range(iterations) for page in pages]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(extract._parse_article, pages))  # 워커 예열
+        started = time.perf_counter()
+        list(pool.map(extract._parse_article, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+        elapsed = time.perf_counter() - started
+    return {
+        "impl": f"fast+pool({workers})",
+        "pages": len(jobs),
+        "seconds": round(elapsed, 4),
+        "pages_per_sec": round(len(jobs) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def compare_outputs(pages: List[str]) -> List[int]:
+    """두 구현의 추출 결과가 다른 페이지의 인덱스를 반환한다."""
+    mismatches = []
+    for idx, page in enumerate(pages):
+        if legacy_parse(page) != extract._parse_article(page):
+            mismatches.append(idx)
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=extract.EXTRACT_WORKERS or 2)
+    parser.add_argument("--single", choices=sorted(IMPLEMENTATIONS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if args.single:
+        print(json.dumps(run_single(args.single, pages, args.iterations)))
+        return
+
+    print(f"코퍼스 {len(pages)}개 페이지 × {args.iterations}회")
+    mismatches = compare_outputs(pages)
+    if mismatches:
+        print(f"⚠️  추출 결과가 다른 페이지: {mismatches}")
+
+    results = []
+    for impl in ("legacy", "fast"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--single", impl, "--corpus", str(args.corpus), "--iterations", str(args.iterations)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    results.append(run_pool(pages, args.iterations, args.workers))
+
+    header = f"{'impl':<16}{'pages/s':>10}{'seconds':>10}{'py peak KB':>12}{'maxrss KB':>12}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['impl']:<16}{row['pages_per_sec']:>10}{row['seconds']:>10}"
+            f"{row.get('tracemalloc_peak_kb', '-'):>12}{row.get('maxrss_kb', '-'):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Throughput benchmark for the local heuristic analysis engine (local_engine.analyze_local).
+
+Run with: `python backend/benchmarks/bench_local_engine.py [--seconds 2]`
+
+The corpus pages are extracted once, then concatenated/truncated to fixed input
+sizes so the numbers are comparable with the `text[:10000]` budget analyze() uses.
+"""
+
+import argparse
+import importlib
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+local_engine = importlib.import_module("service-text.local_engine")
+
+SIZES = (1000, 4000, 10000)
+
+
+def load_texts(corpus_dir: Path) -> List[str]:
+    extract = importlib.import_module("service-text.extract")
+    texts = []
+    for path in sorted(corpus_dir.glob("*.htm*")):
+        text, _title = extract._parse_article(path.read_text(encoding="utf-8", errors="replace"))
+        texts.append(text)
+    if not texts:
+        raise SystemExit(f"코퍼스가 비어 있습니다: {corpus_dir}")
+    return texts
+
+
+def sized_input(text: str, size: int) -> str:
+    repeated = text
+    while len(repeated) < size:
+        repeated += "\n" + text
+    return repeated[:size]
+
+
+def measure(text: str, seconds: float, max_questions: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        local_engine.analyze_local(text, max_questions=max_questions)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "runs": len(latencies),
+        "ops_per_sec": len(latencies) / sum(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=BENCH_DIR / "corpus")
+    parser.add_argument("--seconds", type=float, default=2.0, help="각 입력 크기별 측정 시간")
+    parser.add_argument("--max-questions", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = load_texts(args.corpus)
+    header = f"{'page':<4}{'chars':>8}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for idx, text in enumerate(texts):
+        for size in SIZES:
+            result = measure(sized_input(text, size), args.seconds, args.max_questions)
+            print(
+                f"{idx:<4}{size:>8}{result['ops_per_sec']:>10.1f}"
+                f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Login throughput of the text service with password hashing in the process pool versus threads.
+
+Run with: `python backend/benchmarks/bench_login.py [--users 50] [--requests 400] [--concurrency 16] [--hash-workers 4]`
+
+임시 DB에 사용자를 만들고 `/auth/login`을 동시에 호출해 처리량과 p50/p95/p99를 잰다. 같은 시간 동안
+가벼운 동기 라우트(`GET /`)를 주기적으로 호출해, 로그인이 몰릴 때 다른 요청이 얼마나 밀리는지도 함께 본다.
+`--hash-workers 0`이면 해시를 스레드에서 계산한다(프로세스 풀 도입 전과 비슷한 조건).
+`--seed-rounds`를 현재 설정(PASSWORD_HASH_ROUNDS)과 다르게 주면 첫 로그인마다 해시 갱신(rehash)이 일어난다.
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+PASSWORD = "benchmark-password"
+
+
+def _prepare_env(workdir: Path, args: argparse.Namespace) -> None:
+    """서버 모듈을 임포트하기 전에 설정을 고정한다."""
+    os.environ["RECORDS_DB_PATH"] = str(workdir / "records.db")
+    os.environ["PDF_CACHE_DIR"] = str(workdir / "pdf_cache")
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+    # 대기열이 동시 요청 수보다 작으면 해시 시간 대신 503 거절을 재게 된다.
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(max(16, args.concurrency * 2))
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ.setdefault("TRACE_LOG", "0")
+
+
+def seed_users(records, hashing, users: int, rounds: int) -> List[str]:
+    password_hash = hashing.hash_password(PASSWORD, rounds)
+    return [records.create_user(f"login{idx:05d}", f"로그인{idx}", password_hash)["username"] for idx in range(users)]
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+async def run(server, usernames: List[str], args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=server.app)
+    rng = random.Random(args.seed)
+    jobs = iter(range(args.requests))
+    login_latency: List[float] = []
+    probe_latency: List[float] = []
+    errors: List[str] = []
+    finished = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # 워커 프로세스 기동(spawn) 시간이 측정에 섞이지 않게 먼저 몇 번 로그인한다.
+        for username in usernames[:args.warmup]:
+            await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+
+        async def login_worker() -> None:
+            for _ in jobs:  # 워커들이 같은 이터레이터를 나눠 소비한다
+                form = {"username": rng.choice(usernames), "password": PASSWORD}
+                started = time.perf_counter()
+                response = await client.post("/auth/login", data=form)
+                if response.status_code != 200:
+                    errors.append(f"{response.status_code} {response.text[:80]}")
+                    continue
+                login_latency.append(time.perf_counter() - started)
+
+        async def probe() -> None:
+            while not finished.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                probe_latency.append(time.perf_counter() - started)
+                await asyncio.sleep(args.probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        finally:
+            elapsed = time.perf_counter() - started
+            finished.set()
+            await probe_task
+            await server._shutdown_workers()
+
+    return {
+        "elapsed": elapsed,
+        "logins_per_sec": round(len(login_latency) / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+        "login": _percentiles(login_latency),
+        "probe": _percentiles(probe_latency),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=400, help="로그인 요청 수")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hash-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="PASSWORD_HASH_WORKERS (0이면 스레드에서 계산)")
+    parser.add_argument("--seed-rounds", type=int, help="시드 사용자의 해시 rounds (기본: 현재 설정)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="GET / 호출 간격(초)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="chatterpals-login-bench-") as workdir:
+        _prepare_env(Path(workdir), args)
+        records = importlib.import_module("service-text.records")
+        hashing = importlib.import_module("service-text.password_hashing")
+        server = importlib.import_module("service-text.server")
+
+        seed_rounds = args.seed_rounds or hashing.PASSWORD_HASH_ROUNDS
+        usernames = seed_users(records, hashing, args.users, seed_rounds)
+        print(
+            f"사용자 {len(usernames)}명, rounds {hashing.PASSWORD_HASH_ROUNDS} (시드 {seed_rounds}), "
+            f"해시 워커 {args.hash_workers or '스레드'}, 동시 요청 {args.concurrency}"
+        )
+        result = asyncio.run(run(server, usernames, args))
+        rehashed = sum(
+            1 for name in usernames
+            if not records.get_user_by_username(name)["password_hash"].startswith(f"$pbkdf2-sha256${seed_rounds}$")
+        )
+
+    header = f"{'':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(f"\n로그인 처리량: {result['logins_per_sec']}/s ({args.requests}건, {result['elapsed']:.2f}s, 오류 {len(result['errors'])}건)")
+    print(header)
+    print("-" * len(header))
+    for label, row in (("login", result["login"]), ("GET / (probe)", result["probe"])):
+        print(f"{label:<14}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    if seed_rounds != hashing.PASSWORD_HASH_ROUNDS:
+        print(f"\n해시가 갱신된 사용자: {rehashed}/{len(usernames)}")
+    if result["errors"]:
+        print(f"첫 오류: {result['errors'][0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Micro-benchmarks for the storage and PDF export hot paths in records.py.
+
+Run with: `python -m pytest backend/benchmarks/bench_records.py --benchmark-only`
+(requires `pip install pytest pytest-benchmark`; the file name does not match
+`test_*.py`, so a plain `pytest` run never collects it).
+
+Every database size gets its own copy of records.py loaded against a seeded
+temporary SQLite file (RECORDS_DB_PATH), so `data/records.db` is never touched.
+Compare runs with `--benchmark-autosave` / `--benchmark-compare`.
+"""
+
+import glob
+import importlib.util
+import os
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+RECORDS_PATH = BACKEND_DIR / "service-text" / "records.py"
+
+DB_SIZES = (100, 1000, 10000)  # 기록 수. 사용자는 기록 10건당 1명
+RECORD_SIZES = (5, 50, 500)  # 질문 수 / 대화 턴 수
+PDF_LINES = (50, 500, 5000)
+RECORDS_PER_USER = 10
+TODAY = date.today()
+
+SENTENCES = [
+    "The city council approved a new plan to reduce traffic in the downtown area.",
+    "Researchers found that regular exercise improves memory in older adults.",
+    "Many people now work from home at least two days a week.",
+    "이 기사는 도시의 교통 문제와 해결책을 다룹니다.",
+    "The festival attracted more visitors than any year before.",
+]
+
+
+def _load_records(name: str, db_path: Path):
+    """records.py를 파일 경로로 새로 읽어 db_path에 연결된 독립 모듈을 만든다."""
+    previous = os.environ.get("RECORDS_DB_PATH")
+    os.environ["RECORDS_DB_PATH"] = str(db_path)
+    try:
+        spec = importlib.util.spec_from_file_location(name, RECORDS_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    finally:
+        if previous is None:
+            os.environ.pop("RECORDS_DB_PATH", None)
+        else:
+            os.environ["RECORDS_DB_PATH"] = previous
+    return module
+
+
+def _find_font(records) -> Optional[str]:
+    """BENCH_FONT → records.FONT_CANDIDATES → 시스템 TTF 순으로 쓸 수 있는 폰트를 찾는다."""
+    candidates = [os.getenv("BENCH_FONT") or ""] + list(records.FONT_CANDIDATES)
+    candidates += sorted(glob.glob("/usr/share/fonts/**/*.ttf", recursive=True))
+    for candidate in candidates:
+        if candidate and Path(candidate).is_file():
+            return candidate
+    return None
+
+
+def _paragraph(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(SENTENCES) for _ in range(count))
+
+
+def _questions_payload(rng: random.Random, items: int) -> Dict:
+    return {
+        "items": [
+            {"question": f"Question {n + 1}: {rng.choice(SENTENCES)}", "answer": _paragraph(rng, 2)}
+            for n in range(items)
+        ],
+        "source_text": _paragraph(rng, 12),
+    }
+
+
+def _discussion_payload(rng: random.Random, turns: int) -> Dict:
+    history = []
+    for turn in range(turns):
+        history.append({"role": "ai", "content": f"Follow-up {turn + 1}: {rng.choice(SENTENCES)}"})
+        history.append({"role": "user", "content": _paragraph(rng, 2)})
+    return {"history": history, "initial_questions": [history[0]["content"]], "source_text": _paragraph(rng, 12)}
+
+
+def seed(records, size: int, rng: random.Random) -> List[str]:
+    """size건의 기록을 사용자 size/10명에게 나눠 저장하고 사용자 id 목록을 돌려준다."""
+    user_ids: List[str] = []
+    for idx in range(max(1, size // RECORDS_PER_USER)):
+        user = records.create_user(f"bench{idx:06d}", f"벤치{idx}", "not-a-real-hash")
+        user_ids.append(user["id"])
+    for idx in range(size):
+        user_id = user_ids[idx % len(user_ids)]
+        # 기록의 일부는 오늘 날짜로 만들어 일일 활동 집계에 걸리게 한다.
+        day = TODAY if idx % 5 == 0 else TODAY - timedelta(days=rng.randint(1, 59))
+        kind = rng.choices(("questions", "discussion", "level_test"), weights=(6, 3, 1))[0]
+        evaluation = None
+        if kind == "questions":
+            payload = _questions_payload(rng, 5)
+        elif kind == "discussion":
+            payload = _discussion_payload(rng, 4)
+        else:
+            payload = {"responses": [{"question_id": f"q{n}", "answer": rng.choice("ABCD")} for n in range(25)]}
+            evaluation = {"percentage": round(rng.uniform(20, 100), 1), "level": "B1"}
+        records.save_record(
+            kind,
+            payload,
+            meta={"title": f"{kind} #{idx}", "topics": ["weather", "city"]},
+            evaluation=evaluation,
+            user_id=user_id,
+            created_at=f"{day.isoformat()}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00Z",
+            date=day.isoformat(),
+        )
+    return user_ids
+
+
+# --- 픽스처 ---
+@pytest.fixture(scope="module", params=DB_SIZES, ids=lambda size: f"{size}rec")
+def seeded(request, tmp_path_factory):
+    size = request.param
+    db_path = tmp_path_factory.mktemp(f"records-{size}") / "records.db"
+    records = _load_records(f"bench_records_{size}", db_path)
+    user_ids = seed(records, size, random.Random(size))
+    yield records, user_ids
+    records._CONN.close()
+
+
+@pytest.fixture(scope="module")
+def records(tmp_path_factory):
+    """DB를 쓰지 않는 변환·PDF 함수용 빈 인스턴스."""
+    module = _load_records("bench_records_empty", tmp_path_factory.mktemp("records-empty") / "records.db")
+    yield module
+    module._CONN.close()
+
+
+@pytest.fixture(scope="module")
+def font_path(records):
+    path = _find_font(records)
+    if path is None:
+        pytest.skip("TTF 폰트가 없습니다. BENCH_FONT로 지정하세요.")
+    # 렌더러가 이 폰트를 쓰도록 후보 목록을 바꾸고 lru_cache를 비운다.
+    records.FONT_CANDIDATES = [path]
+    records._load_font.cache_clear()
+    return path
+
+
+# --- 저장소 ---
+def test_list_records(benchmark, seeded):
+    records, _user_ids = seeded
+    benchmark(records.list_records)
+
+
+def test_list_records_for_user(benchmark, seeded):
+    records, user_ids = seeded
+    benchmark(records.list_records_for_user, user_ids[0])
+
+
+def test_build_level_test_entries(benchmark, seeded):
+    records, _user_ids = seeded
+    benchmark(records._build_level_test_entries)
+
+
+def test_build_learning_entries(benchmark, seeded):
+    records, _user_ids = seeded
+    benchmark(records._build_learning_entries)
+
+
+def test_get_daily_activity_counts(benchmark, seeded):
+    records, user_ids = seeded
+    benchmark(records.get_daily_activity_counts, user_ids[0], TODAY.isoformat())
+
+
+def test_save_record(benchmark, seeded):
+    # 측정 중 넣은 행이 DB 크기를 바꾸므로 같은 크기의 읽기 벤치마크 뒤에 둔다.
+    records, user_ids = seeded
+    rng = random.Random(0)
+    payload = _questions_payload(rng, 5)
+    benchmark(
+        lambda: records.save_record(
+            "questions",
+            payload,
+            meta={"title": "bench"},
+            user_id=rng.choice(user_ids),
+            record_id=str(uuid.uuid4()),
+        )
+    )
+
+
+# --- PDF 내보내기 ---
+@pytest.mark.parametrize("size", RECORD_SIZES)
+@pytest.mark.parametrize("kind", ("questions", "discussion"))
+def test_record_to_lines(benchmark, records, kind, size):
+    rng = random.Random(size)
+    payload = _questions_payload(rng, size) if kind == "questions" else _discussion_payload(rng, size)
+    record = {
+        "id": "bench",
+        "type": kind,
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "date": "2024-01-01",
+        "meta": {"title": "bench", "summary": _paragraph(rng, 6), "topics": ["weather"]},
+        "payload": payload,
+        "evaluation": {"scores": {"grammar": 4, "vocabulary": 3, "clarity": 4}, "feedback": "좋습니다."},
+    }
+    benchmark(records._record_to_lines, record)
+
+
+def test_parse_font(benchmark, records, font_path):
+    font_bytes = Path(font_path).read_bytes()
+    benchmark(records._parse_font, font_bytes)
+
+
+@pytest.mark.parametrize("size", PDF_LINES)
+def test_generate_pdf(benchmark, records, font_path, size):
+    rng = random.Random(size)
+    lines = [rng.choice(SENTENCES) for _ in range(size)]
+    records._load_font()  # 폰트 파싱은 test_parse_font에서 따로 잰다.
+    benchmark(records._generate_pdf, lines)
@@ -1,119 +1,116 @@
 import os
-import json
-import google.generativeai as genai
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List
+
+from .llm import PRIORITY_INTERACTIVE, generate_json
+from .local_engine import analyze_local
+from .metrics import LatencyRegistry
+from .singleflight import SingleFlight, content_key
 
 # Gemini 모델 설정
 # 참고: API 키는 server.py에서 이미 설정했으므로 여기서 다시 설정할 필요는 없습니다.
 # genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-def analyze(text: str, max_questions: int = 5) -> Dict[str, Any]:
+ANALYSIS_MODEL = 'gemini-2.0-flash-lite-preview'
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "keywords": {"type": "array", "items": {"type": "string"}},
+        "questions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["summary", "keywords", "questions"],
+}
+ANALYSIS_PROMPT = """
+당신은 신문사 수석 편집장이자 학생들의 비판적 사고력을 키우는 최고의 영어 교사입니다.
+다음 텍스트를 분석하여 아래 JSON 형식에 맞춰 결과를 한 번에 반환해 주세요.
+
+1. `summary`: 텍스트의 핵심 내용을 3-4 문장으로 요약합니다.
+2. `keywords`: 텍스트의 핵심 주제를 나타내는 키워드를 가장 중요한 순서대로 5개 추출합니다.
+3. `questions`: 요약과 키워드를 바탕으로 다음 세 가지 유형을 합해서 총 {max_questions}개의 영어 질문을 만듭니다.
+   - 사실 확인 질문 (Factual Questions): 요약된 내용에서 답을 직접 찾을 수 있는 질문.
+   - 추론 질문 (Inferential Questions): 내용에 암시된 의미나 저자의 의도를 파악해야 하는 질문.
+   - 평가 질문 (Evaluative Questions): 독자의 개인적인 의견이나 가치 판단을 묻는 질문.
+   질문은 반드시 키워드와 관련된 내용이어야 합니다.
+
+텍스트:
+---
+{text}
+---
+"""
+
+# 티어별 지연 시간: llm(성공), llm_failed(실패까지 걸린 시간), local
+TIER_LATENCIES = LatencyRegistry()
+# 같은 텍스트에 대한 동시 분석 요청은 Gemini 호출 하나를 공유합니다.
+ANALYZE_FLIGHT = SingleFlight()
+
+
+class AnalysisSchemaError(ValueError):
+    """LLM 응답이 분석 결과 스키마와 맞지 않을 때 발생한다."""
+
+
+def _as_text_list(value: Any, field: str) -> List[str]:
+    if not isinstance(value, list):
+        raise AnalysisSchemaError(f"'{field}'는 배열이어야 합니다.")
+    items: List[str] = []
+    for item in value:
+        # 모델이 {"question": "..."} 형태로 돌려주는 경우도 허용합니다.
+        if isinstance(item, dict):
+            item = item.get("question") or item.get("text") or item.get("keyword")
+        if isinstance(item, str) and item.strip() and item.strip() not in items:
+            items.append(item.strip())
+    return items
+
+
+def validate_analysis(payload: Any, max_questions: int) -> Dict[str, Any]:
+    """구조화 응답을 검증하고 analyze()의 반환 형태로 정규화한다."""
+    if not isinstance(payload, dict):
+        raise AnalysisSchemaError("분석 결과는 JSON 객체여야 합니다.")
+    summary = payload.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        raise AnalysisSchemaError("'summary'가 비어 있습니다.")
+    keywords = _as_text_list(payload.get("keywords", []), "keywords")
+    questions = _as_text_list(payload.get("questions", []), "questions")
+    if max_questions > 0 and not questions:
+        raise AnalysisSchemaError("'questions'가 비어 있습니다.")
+    return {
+        "summary": summary.strip(),
+        "topics": keywords,  # 기존 'topics' 키에 키워드를 할당
+        "questions": questions[:max(0, max_questions)],
+    }
+
+
+def _analyze_llm(text: str, max_questions: int) -> Dict[str, Any]:
+    prompt = ANALYSIS_PROMPT.format(text=text[:10000], max_questions=max(0, max_questions))
+    payload = generate_json(ANALYSIS_MODEL, prompt, caller="analyze", priority=PRIORITY_INTERACTIVE, schema=ANALYSIS_SCHEMA)
+    return validate_analysis(payload, max_questions)
+
+
+def analyze(text: str, max_questions: int = 5, mode: str = "llm") -> Dict[str, Any]:
     """
-    2단계 처리 방식을 사용하여 텍스트를 분석하고 고품질 질문을 생성합니다.
-    1단계: 텍스트를 요약하고 핵심 키워드를 추출합니다.
-    2단계: 요약본과 키워드를 바탕으로 다양한 유형의 질문을 생성합니다.
+    텍스트를 요약하고 핵심 키워드와 질문을 한 번의 구조화 호출로 생성합니다.
+    호출이나 스키마 검증이 실패하면 추가 원격 호출 없이 로컬 휴리스틱 엔진으로 대체합니다.
+    mode="fast"이면 처음부터 로컬 엔진만 사용합니다. 결과의 `tier`는 실제로 응답한 단계입니다.
     """
     if not text:
-        return {"summary": "", "topics": [], "questions": []}
-
-    try:
-        # --- 1단계: "요약 전문가" AI ---
-        summarizer_model = genai.GenerativeModel('gemini-2.0-flash-lite-preview')
-        
-        summarizer_prompt = f"""
-        당신은 신문사 수석 편집장입니다. 다음 텍스트를 분석하여 아래 JSON 형식에 맞춰 결과를 반환해 주세요.
-
-        1. `summary`: 텍스트의 핵심 내용을 3-4 문장으로 요약합니다.
-        2. `keywords`: 텍스트의 핵심 주제를 나타내는 키워드를 가장 중요한 순서대로 5개 추출합니다.
-
-        텍스트:
-        ---
-        {text[:10000]} 
-        ---
-
-        JSON 출력:
-        """
-
-        summary_response = summarizer_model.generate_content(summarizer_prompt)
-        
-        # AI가 생성한 JSON 문자열을 파싱
-        # 때때로 AI가 코드 블록 마크다운을 포함하므로 제거
-        cleaned_json_str = summary_response.text.strip().replace('```json', '').replace('```', '').strip()
-        summary_data = json.loads(cleaned_json_str)
-        
-        summary = summary_data.get("summary", "")
-        keywords = summary_data.get("keywords", [])
-
-        if not summary:
-             raise ValueError("1단계 요약 생성에 실패했습니다.")
-
-        if max_questions <= 0:
-            return {
-                "summary": summary,
-                "topics": keywords,
-                "questions": [],
-            }
-
-        # --- 2단계: "질문 생성가" AI ---
-        question_generator_model = genai.GenerativeModel('gemini-2.0-flash-lite-preview')
-
-        question_generator_prompt = f"""
-        당신은 학생들의 비판적 사고력을 키우는 최고의 영어 교사입니다. 학생들을 위해서 질문은 영어로 만들어주세요
-        아래에 제공된 "핵심 요약"과 "주요 키워드"를 바탕으로, 다음 세 가지 유형의 질문을 합해서 총 {max_questions}개 생성해 주세요.
-
-        1. **사실 확인 질문 (Factual Questions):** 요약된 내용에서 답을 직접 찾을 수 있는 질문.
-        2. **추론 질문 (Inferential Questions):** 내용에 암시된 의미나 저자의 의도를 파악해야 하는 질문.
-        3. **평가 질문 (Evaluative Questions):** 독자의 개인적인 의견이나 가치 판단을 묻는 질문.
-
-        질문은 반드시 "주요 키워드"와 관련된 내용이어야 합니다. 결과는 JSON 형식의 질문 목록으로만 반환해 주세요.
-
-        핵심 요약:
-        ---
-        {summary}
-        ---
-
-        주요 키워드: {", ".join(keywords)}
-
-        JSON 출력 (질문 목록):
-        """
-        
-        questions_response = question_generator_model.generate_content(question_generator_prompt)
-        cleaned_json_str = questions_response.text.strip().replace('```json', '').replace('```', '').strip()
-        raw_questions = json.loads(cleaned_json_str)
-
-        if isinstance(raw_questions, dict):
-            questions_list = raw_questions.get("questions") or raw_questions.get("items") or []
-        elif isinstance(raw_questions, list):
-            questions_list = raw_questions
-        else:
-            questions_list = []
-
-        if max_questions > 0:
-            questions_list = questions_list[:max_questions]
-        else:
-            questions_list = []
-
-        return {
-            "summary": summary,
-            "topics": keywords, # 기존 'topics' 키에 키워드를 할당
-            "questions": questions_list,
-        }
-
-    except Exception as e:
-        print(f"AI 분석 중 오류 발생: {e}")
-        # 오류 발생 시, 간단한 분석으로 대체 (Fallback)
+        return {"summary": "", "topics": [], "questions": [], "tier": "none"}
+
+    if mode != "fast":
+        started = time.perf_counter()
         try:
-            model = genai.GenerativeModel('gemini-2.0-flash-lite-preview')
-            prompt = f"다음 텍스트에서 토론 질문 {max_questions}개를 만들어줘: {text[:2000]}"
-            response = model.generate_content(prompt)
-            # 간단한 텍스트 분리
-            questions = [q.strip() for q in response.text.split('\n') if q.strip()]
-            trimmed = questions[:max(0, max_questions)] if max_questions else []
-            return {
-                "summary": text[:200] + "...",
-                "topics": [],
-                "questions": trimmed,
-            }
-        except Exception as fallback_e:
-            print(f"Fallback 분석 중 오류 발생: {fallback_e}")
-            return {"summary": "분석 중 오류가 발생했습니다.", "topics": [], "questions": []}
+            key = content_key("analyze", ANALYSIS_MODEL, text[:10000], max_questions)
+            result = ANALYZE_FLIGHT.do(key, _analyze_llm, text, max_questions)
+            TIER_LATENCIES.observe("llm", time.perf_counter() - started)
+            return {**result, "tier": "llm"}
+        except Exception as e:
+            TIER_LATENCIES.observe("llm_failed", time.perf_counter() - started)
+            print(f"AI 분석 중 오류 발생: {e}")
+
+    started = time.perf_counter()
+    result = analyze_local(text, max_questions=max_questions)
+    TIER_LATENCIES.observe("local", time.perf_counter() - started)
+    return {**result, "tier": "local"}
+
+
+def analysis_latency_stats() -> Dict[str, Dict[str, Any]]:
+    return TIER_LATENCIES.snapshot()
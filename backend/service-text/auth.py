@@ -1,20 +1,27 @@
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
-from .records import get_user_by_id, get_user_by_username
+from .metrics import REGISTRY
+from .password_hashing import PASSWORD_HASH_ROUNDS, PASSWORD_HASHER, crypt_context
+from .records import get_user_by_id, get_user_by_username, update_user_password_hash
 
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+pwd_context = crypt_context(PASSWORD_HASH_ROUNDS)
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-this-secret")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))  # 0이면 캐시하지 않음
+AUTH_USER_CACHE_MAX = int(os.getenv("AUTH_USER_CACHE_MAX", "4096"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
@@ -35,6 +42,11 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash와 같으나 해시 계산을 PASSWORD_HASHER 프로세스 풀에서 한다."""
+    return await PASSWORD_HASHER.hash(password)
+
+
 def sanitize_user(user: Dict) -> Dict:
     return {
         "id": user["id"],
@@ -44,15 +56,93 @@ def sanitize_user(user: Dict) -> Dict:
     }
 
 
-def authenticate_user(username: str, password: str) -> Optional[Dict]:
-    user = get_user_by_username(username.strip().lower())
+async def authenticate_user(username: str, password: str) -> Optional[Dict]:
+    """비밀번호 검증은 PASSWORD_HASHER에서 하고, 해시의 rounds가 현재 설정과 다르면 새 해시로 바꿔 저장한다.
+
+    DB 조회·저장은 공유 SQLite 연결을 쓰므로 이벤트 루프를 막지 않도록 스레드에서 실행한다.
+    """
+    user = await asyncio.to_thread(get_user_by_username, username.strip().lower())
     if not user:
         return None
-    if not verify_password(password, user["password_hash"]):
+    valid, new_hash = await PASSWORD_HASHER.verify_and_update(password, user["password_hash"])
+    if not valid:
         return None
+    if new_hash:
+        await asyncio.to_thread(update_user_password_hash, user["id"], new_hash)
     return sanitize_user(user)
 
 
+class TokenUserCache:
+    """검증을 마친 토큰 → sanitize_user 결과. 인증이 필요한 요청마다 JWT 디코드와 사용자 조회를 반복하지 않는다.
+
+    항목은 AUTH_USER_CACHE_TTL과 토큰 만료(exp) 중 이른 시각까지만 쓰고, 개수가 max_entries를 넘으면
+    가장 오래 쓰지 않은 토큰부터 버린다. 사용자 정보가 바뀌면 invalidate_user로 그 사용자의 토큰을 모두 지운다.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # 무효화 횟수. 조회 도중 무효화가 있었으면 그 결과는 저장하지 않는다.
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, token: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                result, user = "miss", None
+            elif entry[0] <= time.time():
+                del self._entries[token]
+                result, user = "expired", None
+            else:
+                self._entries.move_to_end(token)
+                result, user = "hit", dict(entry[1])
+        AUTH_USER_CACHE_REQUESTS.inc(result=result)
+        return user
+
+    def put(self, token: str, user: Dict, token_exp: Optional[float], generation: int) -> None:
+        expires = time.time() + self.ttl
+        if token_exp is not None:
+            expires = min(expires, token_exp)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[token] = (expires, dict(user))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            stale = [token for token, (_expires, user) in self._entries.items() if user["id"] == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+AUTH_USER_CACHE_REQUESTS = REGISTRY.counter(
+    "auth_user_cache_requests_total", "토큰 → 사용자 캐시 조회 결과(hit|miss|expired)별 수", ("result",)
+)
+TOKEN_USER_CACHE = TokenUserCache(AUTH_USER_CACHE_TTL, AUTH_USER_CACHE_MAX)
+REGISTRY.gauge("auth_user_cache_entries", "토큰 → 사용자 캐시에 든 항목 수", callback=lambda: len(TOKEN_USER_CACHE))
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    """records.add_user_listener에 등록해 닉네임 등이 바뀌면 캐시된 사용자 정보를 버린다."""
+    TOKEN_USER_CACHE.invalidate_user(user_id)
+
+
 def create_access_token(data: Dict[str, str], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -62,6 +152,11 @@ def create_access_token(data: Dict[str, str], expires_delta: Optional[timedelta]
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
+    if TOKEN_USER_CACHE.enabled:
+        cached = TOKEN_USER_CACHE.get(token)
+        if cached is not None:
+            return cached
+    generation = TOKEN_USER_CACHE.generation
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -78,7 +173,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
     user = get_user_by_id(token_data.sub)
     if user is None:
         raise credentials_exception
-    return sanitize_user(user)
+    sanitized = sanitize_user(user)
+    if TOKEN_USER_CACHE.enabled:
+        exp = payload.get("exp")
+        TOKEN_USER_CACHE.put(token, sanitized, float(exp) if exp is not None else None, generation)
+    return sanitized
 
 
 async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme_optional)) -> Optional[Dict]:
@@ -1,16 +1,45 @@
 import uuid
 import json
 from typing import Dict, List, Optional
-import google.generativeai as genai
 
 # 'analyze' 임포트를 제거하여 의존성을 없앱니다.
+from .llm import PRIORITY_INTERACTIVE, generate, response_text
+from .local_engine import analyze_local
 from .records import save_discussion_record
+from .singleflight import SingleFlight, content_key
+
+CHAT_MODEL = 'gemini-2.0-flash-lite-preview'
+# 같은 글로 동시에 시작된 토론은 첫 질문 생성 호출을 공유합니다.
+FIRST_QUESTION_FLIGHT = SingleFlight()
+
+
+def _generate_first_question(text: str) -> str:
+    # AI가 직접 첫 질문을 생성하도록 프롬프트를 구성합니다.
+    prompt = f"""
+    다음 텍스트에 대해 깊이 있는 토론을 시작하려고 합니다.
+    이 텍스트의 핵심 내용을 파악하고, 사용자의 비판적 사고를 자극할 수 있는 첫 번째 토론 질문을 하나만 만들어 주세요.
+
+    텍스트:
+    ---
+    {text}
+    ---
+    """
+    response = generate(CHAT_MODEL, prompt, caller="chat", priority=PRIORITY_INTERACTIVE)
+    return response_text(response).strip()
+
+
+def _local_question(text: str, asked: List[str]) -> str:
+    """Gemini를 쓸 수 없을 때 로컬 엔진의 템플릿 질문 중 아직 하지 않은 것을 고른다."""
+    candidates = analyze_local(text, max_questions=len(asked) + 1)["questions"]
+    for question in candidates:
+        if question not in asked:
+            return question
+    return candidates[-1] if candidates else "What is your opinion on the main point of the text?"
+
 
 class ChatSession:
     def __init__(self, text: str, **kwargs):
         self.text = text
-        # Gemini 모델을 직접 초기화합니다.
-        self.model = genai.GenerativeModel('gemini-2.0-flash-lite-preview')
         self.questions: List[str] = []
         self.q_index = 0
         self.history: List[Dict] = []
@@ -22,18 +51,13 @@ class ChatSession:
         self.max_questions: int = int(kwargs.get('max_q') or kwargs.get('max_questions') or 6)
 
     def first_question(self) -> str:
-        # AI가 직접 첫 질문을 생성하도록 프롬프트를 구성합니다.
-        prompt = f"""
-        다음 텍스트에 대해 깊이 있는 토론을 시작하려고 합니다.
-        이 텍스트의 핵심 내용을 파악하고, 사용자의 비판적 사고를 자극할 수 있는 첫 번째 토론 질문을 하나만 만들어 주세요.
-
-        텍스트:
-        ---
-        {self.text[:4000]}
-        ---
-        """
-        response = self.model.generate_content(prompt)
-        first_q = response.text.strip()
+        source = self.text[:4000]
+        key = content_key("first_question", CHAT_MODEL, source)
+        try:
+            first_q = FIRST_QUESTION_FLIGHT.do(key, _generate_first_question, source)
+        except Exception as e:
+            print(f"첫 질문 생성 실패, 로컬 엔진으로 대체: {e}")
+            first_q = _local_question(source, self.questions)
         self.questions.append(first_q)
         self.q_index = 1
         return first_q
@@ -57,8 +81,12 @@ class ChatSession:
         {json.dumps(self.history, ensure_ascii=False)}
         ---
         """
-        response = self.model.generate_content(prompt)
-        next_q = response.text.strip()
+        try:
+            response = generate(CHAT_MODEL, prompt, caller="chat", priority=PRIORITY_INTERACTIVE)
+            next_q = response_text(response).strip()
+        except Exception as e:
+            print(f"후속 질문 생성 실패, 로컬 엔진으로 대체: {e}")
+            next_q = _local_question(self.text[:4000], self.questions)
         self.questions.append(next_q)
         return next_q
 
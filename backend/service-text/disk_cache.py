@@ -0,0 +1,159 @@
+"""Size-bounded LRU cache that keeps blobs as files on local disk."""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더 값에 etag(또는 *)가 들어 있으면 True. 약한 비교(W/ 무시)를 쓴다."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class DiskLRUCache:
+    """파일 하나당 항목 하나를 저장하고, 전체 크기가 max_bytes를 넘으면 오래된 항목부터 지운다.
+
+    키는 파일 이름으로 그대로 쓰이므로 경로 구분자가 없는 안전한 문자열이어야 한다.
+    최근 사용 순서는 메모리의 OrderedDict로 관리하고, 재시작 시에는 파일 mtime으로 복원한다.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = '') -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max(0, int(max_bytes))
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._total = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        if not key or '/' in key or '\\' in key or key.startswith('.'):
+            raise ValueError(f'invalid cache key: {key!r}')
+        return self.directory / f'{key}{self.suffix}'
+
+    def _load_index(self) -> None:
+        found = []
+        for path in self.directory.iterdir():
+            if not path.is_file() or path.name.startswith('.'):
+                continue
+            if self.suffix and not path.name.endswith(self.suffix):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            key = path.name[:-len(self.suffix)] if self.suffix else path.name
+            found.append((stat.st_mtime, key, stat.st_size))
+        for _mtime, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self._total > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _touch_locked(self, key: str) -> Optional[Path]:
+        if key not in self._entries:
+            return None
+        path = self._path(key)
+        if not path.exists():
+            self._total -= self._entries.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def path_for(self, key: str) -> Optional[Path]:
+        """캐시에 있으면 파일 경로를 돌려주고 최근 사용으로 표시한다."""
+        with self._lock:
+            return self._touch_locked(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            self.discard(key)
+            return None
+
+    def put(self, key: str, data: bytes) -> Optional[Path]:
+        """데이터를 원자적으로 기록한다. 단일 항목이 한도보다 크면 저장하지 않는다."""
+        size = len(data)
+        if size > self.max_bytes:
+            return None
+        path = self._path(key)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp_name, path)
+        except Exception:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total -= previous
+            self._entries[key] = size
+            self._total += size
+            self._evict_locked()
+        return path
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._total -= size
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def discard_prefix(self, prefix: str) -> int:
+        """prefix로 시작하는 모든 항목을 지우고 지운 개수를 반환한다."""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._total -= self._entries.pop(key)
+                try:
+                    self._path(key).unlink()
+                except FileNotFoundError:
+                    pass
+        return len(keys)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
@@ -1,45 +1,351 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import ipaddress
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+import lxml.html
+from lxml import etree
 from readability import Document
 
+from .process_pool import BoundedProcessPool, PoolBusyError
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+FETCH_TIMEOUT = float(os.getenv("EXTRACT_FETCH_TIMEOUT", "10"))
+FETCH_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", str(5 * 1024 * 1024)))
+EXTRACT_CACHE_TTL = float(os.getenv("EXTRACT_CACHE_TTL", "600"))
+EXTRACT_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACT_CACHE_MAX_ENTRIES", "256"))
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+# 0이면 본문 파싱을 호출한 스레드에서 바로 실행합니다.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# 본문 파싱이 이보다 오래 걸리면 추출 실패로 처리하고 그 워커를 회수합니다.
+EXTRACT_PARSE_TIMEOUT = float(os.getenv("EXTRACT_PARSE_TIMEOUT", "15"))
+EXTRACT_PARSE_MAX_PENDING = int(os.getenv("EXTRACT_PARSE_MAX_PENDING", str(max(1, EXTRACT_WORKERS) * 16)))
+
+
+class ResponseTooLargeError(ValueError):
+    """응답 본문이 FETCH_MAX_BYTES를 넘을 때 발생한다."""
+
+
+class UnsafeURLError(ValueError):
+    """http(s)가 아니거나 사설·루프백·링크 로컬 등 공인 주소가 아닌 곳을 가리키는 URL."""
+
+
+@dataclass
+class _CacheEntry:
+    text: str
+    meta: Dict[str, str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.fetched_at < EXTRACT_CACHE_TTL
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+# --- 추출 결과 캐시 ---------------------------------------------------
+
+_CACHE: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache_get(url: str) -> Optional[_CacheEntry]:
+    with _CACHE_LOCK:
+        entry = _CACHE.get(url)
+        if entry is not None:
+            _CACHE.move_to_end(url)
+        return entry
+
+
+def _cache_put(url: str, entry: _CacheEntry) -> None:
+    with _CACHE_LOCK:
+        _CACHE[url] = entry
+        _CACHE.move_to_end(url)
+        while len(_CACHE) > EXTRACT_CACHE_MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+
+
+def _revalidated(entry: _CacheEntry) -> Tuple[str, dict]:
+    entry.fetched_at = time.monotonic()
+    return entry.text, dict(entry.meta)
+
+
+# --- HTTP 클라이언트 (연결 풀 공유) -----------------------------------
+
+_SYNC_CLIENT: Optional[httpx.Client] = None
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+# --- 요청 대상 검사 ----------------------------------------------------
+# 사용자가 준 URL을 서버가 대신 가져오므로, 내부망(메타데이터 서버, localhost 관리 포트 등)에
+# 닿지 않도록 리다이렉트를 포함한 모든 요청 직전에 이름을 풀어 공인 주소인지 확인한다.
+# 확인과 실제 연결 사이에 DNS 응답이 바뀌는 경우(DNS rebinding)까지 막지는 못한다.
+
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def _target(request: httpx.Request) -> Tuple[str, int]:
+    url = request.url
+    if url.scheme not in ("http", "https") or not url.host:
+        raise UnsafeURLError("http 또는 https 주소만 분석할 수 있습니다.")
+    return url.host, url.port or (443 if url.scheme == "https" else 80)
+
+
+def _reject_private(host: str, infos) -> None:
+    if not infos or not all(_is_public_address(info[4][0]) for info in infos):
+        raise UnsafeURLError(f"이 주소의 페이지는 가져올 수 없습니다: {host}")
+
+
+def _check_request_target(request: httpx.Request) -> None:
+    host, port = _target(request)
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise httpx.ConnectError(f"{host}: {exc}", request=request) from exc
+    _reject_private(host, infos)
+
+
+async def _check_request_target_async(request: httpx.Request) -> None:
+    host, port = _target(request)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise httpx.ConnectError(f"{host}: {exc}", request=request) from exc
+    _reject_private(host, infos)
+
+
+def _get_sync_client() -> httpx.Client:
+    global _SYNC_CLIENT
+    with _CLIENT_LOCK:
+        if _SYNC_CLIENT is None:
+            _SYNC_CLIENT = httpx.Client(
+                headers=DEFAULT_HEADERS,
+                timeout=FETCH_TIMEOUT,
+                limits=HTTP_POOL_LIMITS,
+                follow_redirects=True,
+                event_hooks={"request": [_check_request_target]},
+            )
+        return _SYNC_CLIENT
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _ASYNC_CLIENT
+    with _CLIENT_LOCK:
+        if _ASYNC_CLIENT is None:
+            _ASYNC_CLIENT = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=FETCH_TIMEOUT,
+                limits=HTTP_POOL_LIMITS,
+                follow_redirects=True,
+                event_hooks={"request": [_check_request_target_async]},
+            )
+        return _ASYNC_CLIENT
+
+
+async def close_http_clients() -> None:
+    global _SYNC_CLIENT, _ASYNC_CLIENT
+    with _CLIENT_LOCK:
+        sync_client, _SYNC_CLIENT = _SYNC_CLIENT, None
+        async_client, _ASYNC_CLIENT = _ASYNC_CLIENT, None
+    if sync_client is not None:
+        sync_client.close()
+    if async_client is not None:
+        await async_client.aclose()
+
+
+def _check_declared_length(response: httpx.Response) -> None:
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > FETCH_MAX_BYTES:
+        raise ResponseTooLargeError("페이지 용량이 너무 커서 분석할 수 없습니다.")
+
+
+def _append_limited(buffer: bytearray, chunk: bytes) -> None:
+    buffer.extend(chunk)
+    if len(buffer) > FETCH_MAX_BYTES:
+        raise ResponseTooLargeError("페이지 용량이 너무 커서 분석할 수 없습니다.")
+
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_\-]+)""", re.IGNORECASE)
+
+
+def _decode_body(body: bytes, response: httpx.Response) -> str:
+    # 헤더에 charset이 없으면 문서 앞부분의 <meta charset>을 보고, 그래도 없으면 UTF-8로 읽습니다.
+    charset = response.charset_encoding
+    if not charset:
+        match = _META_CHARSET_RE.search(body[:4096])
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+# --- 본문 추출 ---------------------------------------------------------
+
+
+def _tree_text(node) -> str:
+    """lxml 트리의 텍스트 노드를 문서 순서대로 모아 줄 단위로 합친다.
+
+    BeautifulSoup의 get_text(separator='\n', strip=True)와 같은 결과를 내지만
+    요약 HTML을 문자열로 만들었다가 다시 파싱하지 않는다.
+    """
+    parts = []
+    for event, element in etree.iterwalk(node, events=("start", "end")):
+        if event == "start":
+            if isinstance(element.tag, str) and element.text:
+                parts.append(element.text)
+        elif element is not node and element.tail:
+            parts.append(element.tail)
+    return "\n".join(stripped for stripped in (part.strip() for part in parts) if stripped)
+
+
+def _parse_article(html: str) -> Tuple[str, str]:
+    # Readability를 사용하여 본문 추출
+    doc = Document(html)
+    title = doc.title()
+    content_html = doc.summary()
+
+    # summary()가 끝나면 doc.html에 정리된 본문 노드가 남아 있으므로 그 트리에서 바로 텍스트를 뽑습니다.
+    node = getattr(doc, "html", None)
+    if not isinstance(node, etree._Element):
+        node = lxml.html.fromstring(content_html)
+    return _tree_text(node), title
+
+
+class ParseBusyError(PoolBusyError):
+    """파싱 대기열이 가득 차서 새 작업을 받을 수 없을 때 발생한다."""
+
+
+_PARSE_POOL = BoundedProcessPool(
+    "extract_parse", EXTRACT_WORKERS, EXTRACT_PARSE_MAX_PENDING, EXTRACT_PARSE_TIMEOUT, busy_error=ParseBusyError
+)
+
+
+def shutdown_parse_pool() -> None:
+    _PARSE_POOL.shutdown()
+
+
+def _parse_failed(exc: Exception) -> ValueError:
+    if isinstance(exc, ParseBusyError):
+        return ValueError("본문 추출 요청이 많습니다. 잠시 후 다시 시도해 주세요.")
+    return ValueError(
+        "본문을 추출하는 데 시간이 너무 오래 걸립니다. "
+        "분석하고 싶은 부분을 마우스로 직접 선택한 후 다시 시도해 주세요."
+    )
+
+
+def _parse_in_pool(html: str) -> Tuple[str, str]:
+    # EXTRACT_WORKERS가 0이면 호출한 스레드에서 바로 실행하므로 시간 제한이 없습니다.
+    try:
+        return _PARSE_POOL.run_sync(_parse_article, html)
+    except (ParseBusyError, TimeoutError) as exc:
+        raise _parse_failed(exc) from exc
+
+
+async def _parse_in_pool_async(html: str) -> Tuple[str, str]:
+    try:
+        return await _PARSE_POOL.run(_parse_article, html)
+    except (ParseBusyError, asyncio.TimeoutError) as exc:
+        raise _parse_failed(exc) from exc
+
+
+def _build_result(url: str, text: str, title: str, response: httpx.Response) -> Tuple[str, dict]:
+    # 개선된 부분: 추출된 텍스트가 유의미한지 길이를 확인
+    # "로그인하세요" 같은 짧은 문구로 토론이 시작되는 것을 방지합니다.
+    if not text or len(text) < 100: # 100자 미만은 유의미한 콘텐츠가 아니라고 판단
+        raise ValueError(
+            f"자동으로 본문을 추출할 수 없거나 내용이 너무 짧습니다. "
+            f"사이트가 동적으로 로딩되거나 분석이 어려운 구조일 수 있습니다. "
+            f"분석하고 싶은 부분을 마우스로 직접 선택한 후 다시 시도해 주세요."
+        )
+
+    meta = {
+        "title": title,
+        "url": url,
+    }
+    _cache_put(
+        url,
+        _CacheEntry(
+            text=text,
+            meta=meta,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.monotonic(),
+        ),
+    )
+    return text, dict(meta)
+
+
 def extract_from_url(url: str) -> tuple[str, dict]:
     """
     주어진 URL에서 웹페이지의 본문 텍스트와 메타데이터를 추출합니다.
     추출된 텍스트가 너무 짧으면 오류를 발생시켜 수동 선택을 유도합니다.
+    같은 URL은 EXTRACT_CACHE_TTL 동안 캐시를 쓰고, 이후에는 조건부 GET으로 재검증합니다.
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    entry = _cache_get(url)
+    if entry is not None and entry.is_fresh():
+        return entry.text, dict(entry.meta)
+    headers = entry.conditional_headers() if entry is not None else {}
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        # Readability를 사용하여 본문 추출
-        doc = Document(response.text)
-        title = doc.title()
-        content_html = doc.summary()
-        
-        # HTML 태그를 제거하여 순수 텍스트만 추출
-        soup = BeautifulSoup(content_html, 'lxml')
-        text = soup.get_text(separator='\n', strip=True)
-
-        # 개선된 부분: 추출된 텍스트가 유의미한지 길이를 확인
-        # "로그인하세요" 같은 짧은 문구로 토론이 시작되는 것을 방지합니다.
-        if not text or len(text) < 100: # 100자 미만은 유의미한 콘텐츠가 아니라고 판단
-            raise ValueError(
-                f"자동으로 본문을 추출할 수 없거나 내용이 너무 짧습니다. "
-                f"사이트가 동적으로 로딩되거나 분석이 어려운 구조일 수 있습니다. "
-                f"분석하고 싶은 부분을 마우스로 직접 선택한 후 다시 시도해 주세요."
-            )
-
-        meta = {
-            "title": title,
-            "url": url,
-        }
-        return text, meta
+        with _get_sync_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and entry is not None:
+                return _revalidated(entry)
+            response.raise_for_status()
+            _check_declared_length(response)
+            body = bytearray()
+            for chunk in response.iter_bytes():
+                _append_limited(body, chunk)
+        html = _decode_body(bytes(body), response)
+        text, title = _parse_in_pool(html)
+        return _build_result(url, text, title, response)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"URL로부터 콘텐츠를 가져오는 데 실패했습니다: {e}")
         # 클라이언트에게 전달될 오류 메시지를 표준화합니다.
         raise ValueError(f"URL에 접근하는 중 오류가 발생했습니다: {url}")
 
+
+async def extract_from_url_async(url: str) -> tuple[str, dict]:
+    """extract_from_url의 비동기 버전. 본문 파싱은 이벤트 루프 밖에서 실행합니다."""
+    entry = _cache_get(url)
+    if entry is not None and entry.is_fresh():
+        return entry.text, dict(entry.meta)
+    headers = entry.conditional_headers() if entry is not None else {}
+    try:
+        async with _get_async_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and entry is not None:
+                return _revalidated(entry)
+            response.raise_for_status()
+            _check_declared_length(response)
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                _append_limited(body, chunk)
+        html = _decode_body(bytes(body), response)
+        text, title = await _parse_in_pool_async(html)
+        return _build_result(url, text, title, response)
+
+    except httpx.HTTPError as e:
+        print(f"URL로부터 콘텐츠를 가져오는 데 실패했습니다: {e}")
+        raise ValueError(f"URL에 접근하는 중 오류가 발생했습니다: {url}")
@@ -0,0 +1,216 @@
+"""Offline stand-in for google.generativeai models, selected with LLM_BACKEND=fake.
+
+부하 테스트용 가짜 백엔드. 로그정규 분포 지연, 호출 종류별 고정 JSON 응답, 오류 주입을 지원하며
+FAKE_LLM_SEED가 같으면 지연과 오류 발생 순서가 항상 같다.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # pragma: no cover - google-generativeai가 api_core를 함께 설치한다
+    google_exceptions = None
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))  # 지연 중앙값
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))  # 로그정규 분포의 sigma
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))  # 503 비율
+FAKE_LLM_THROTTLE_RATE = float(os.getenv("FAKE_LLM_THROTTLE_RATE", "0"))  # 429 비율
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "42"))
+FAKE_LLM_RESPONSES = os.getenv("FAKE_LLM_RESPONSES")  # 기본 응답을 덮어쓸 JSON 파일 경로
+# stream=True 호출에서 첫 조각 이후 조각 사이의 간격(첫 조각까지는 위의 지연을 따른다)
+FAKE_LLM_STREAM_CHUNK_MS = float(os.getenv("FAKE_LLM_STREAM_CHUNK_MS", "30"))
+
+_COUNT_RE = re.compile(r"Create (\d+) multiple-choice")
+
+DEFAULT_RESPONSES: Dict[str, Any] = {
+    "analysis": {
+        "summary": "The article describes a recent event and how the people involved responded to it.",
+        "keywords": ["event", "community", "response", "policy", "future"],
+        "questions": [
+            "What happened according to the text?",
+            "Who was most affected by the event?",
+            "Why do you think the author focuses on the community response?",
+            "What might happen next, based on the text?",
+            "Do you agree with how the situation was handled? Why or why not?",
+        ],
+    },
+    "evaluation": {
+        "scores": {"grammar": 4, "vocabulary": 3, "clarity": 4},
+        "feedback": "문장 구조는 자연스럽지만 어휘를 조금 더 다양하게 써 보세요. 예: I believe the policy will help many families.",
+    },
+    "level_test_item": {
+        "skill": "grammar",
+        "level": "B1",
+        "prompt": "She ___ to the library every Saturday.",
+        "passage": None,
+        "options": [
+            {"id": "A", "text": "go"},
+            {"id": "B", "text": "goes"},
+            {"id": "C", "text": "going"},
+            {"id": "D", "text": "gone"},
+        ],
+        "answer": "B",
+        "explanation": "3인칭 단수 현재형에는 -s를 붙입니다.",
+    },
+    "text": [
+        "What do you think is the most important point of this text, and why?",
+        "How would this situation affect people in your community?",
+        "Can you give an example from your own experience that relates to this topic?",
+        "What would you do differently if you were in charge?",
+    ],
+    "transcript": "I think the article is about how cities deal with heavy rain.",
+}
+
+
+def _load_responses() -> Dict[str, Any]:
+    responses = dict(DEFAULT_RESPONSES)
+    if FAKE_LLM_RESPONSES:
+        with open(FAKE_LLM_RESPONSES, "r", encoding="utf-8") as fh:
+            responses.update(json.load(fh))
+    return responses
+
+
+RESPONSES = _load_responses()
+_RNG = random.Random(FAKE_LLM_SEED)
+_RNG_LOCK = threading.Lock()
+
+
+def _draw() -> Dict[str, float]:
+    """다음 호출의 지연(초)과 오류 여부를 뽑는다. 시드가 같으면 뽑히는 값의 순서도 같다."""
+    with _RNG_LOCK:
+        spread = _RNG.lognormvariate(0, FAKE_LLM_LATENCY_SIGMA)
+        roll = _RNG.random()
+    return {"latency": max(0.0, FAKE_LLM_LATENCY_MS) / 1000 * spread, "roll": roll}
+
+
+def _injected_error(roll: float) -> Optional[Exception]:
+    if roll < FAKE_LLM_THROTTLE_RATE:
+        return google_exceptions.ResourceExhausted("fake: quota exceeded") if google_exceptions else RuntimeError("429")
+    if roll < FAKE_LLM_THROTTLE_RATE + FAKE_LLM_ERROR_RATE:
+        return google_exceptions.ServiceUnavailable("fake: backend unavailable") if google_exceptions else RuntimeError("503")
+    return None
+
+
+def _prompt_text(contents: Any) -> str:
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return _prompt_text(contents.get("parts") or [])
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_prompt_text(item) for item in contents if isinstance(item, (str, dict)))
+    return str(contents)
+
+
+def _has_audio(contents: Any) -> bool:
+    """업로드한 파일 핸들이나 inline 오디오({"mime_type", "data"})가 섞여 있는지 본다."""
+    if isinstance(contents, dict):
+        if "mime_type" in contents:
+            return True
+        return _has_audio(contents.get("parts") or [])
+    if isinstance(contents, (list, tuple)):
+        return any(_has_audio(item) for item in contents)
+    return not isinstance(contents, str)
+
+
+def _pick(options: List[str], prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return options[digest[0] % len(options)]
+
+
+def _canned(contents: Any, generation_config: Optional[Dict[str, Any]]) -> str:
+    """호출 내용으로 어떤 종류의 요청인지 추정해 고정 응답을 만든다."""
+    config = generation_config or {}
+    prompt = _prompt_text(contents)
+    if config.get("response_mime_type") == "application/json":
+        schema = config.get("response_schema") or {}
+        if "summary" in (schema.get("properties") or {}):
+            return json.dumps(RESPONSES["analysis"], ensure_ascii=False)
+        match = _COUNT_RE.search(prompt)
+        if match:
+            items = [RESPONSES["level_test_item"]] * int(match.group(1))
+            return json.dumps({"questions": items}, ensure_ascii=False)
+        return json.dumps(RESPONSES["evaluation"], ensure_ascii=False)
+    # 파일(오디오)이 섞인 호출은 STT로 본다.
+    if _has_audio(contents):
+        return RESPONSES["transcript"]
+    return _pick(RESPONSES["text"], prompt)
+
+
+def _response(text: str, prompt: str) -> SimpleNamespace:
+    part = SimpleNamespace(text=text, inline_data=None, function_call=None)
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]), finish_reason=1)
+    usage = SimpleNamespace(
+        prompt_token_count=max(1, len(prompt) // 4),
+        candidates_token_count=max(1, len(text) // 4),
+        total_token_count=max(1, len(prompt) // 4) + max(1, len(text) // 4),
+    )
+    return SimpleNamespace(text=text, candidates=[candidate], usage_metadata=usage)
+
+
+class _FakeStream:
+    """generate_content_async(stream=True)가 돌려주는 응답처럼 몇 단어씩 나눈 조각을 내보낸다."""
+
+    def __init__(self, text: str, prompt: str) -> None:
+        self._pieces = re.findall(r"(?:\S+\s*){1,4}", text) or [text]
+        self._prompt = prompt
+
+    async def __aiter__(self):
+        for index, piece in enumerate(self._pieces):
+            if index:
+                await asyncio.sleep(FAKE_LLM_STREAM_CHUNK_MS / 1000)
+            yield _response(piece, self._prompt)
+
+
+class FakeModel:
+    """genai.GenerativeModel과 같은 generate_content / generate_content_async 인터페이스."""
+
+    def __init__(self, model_name: str, system_instruction: Optional[str] = None) -> None:
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def _plan(self, request_options: Optional[Dict[str, Any]]):
+        draw = _draw()
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and draw["latency"] > timeout:
+            error = google_exceptions.DeadlineExceeded("fake: deadline exceeded") if google_exceptions else TimeoutError()
+            return timeout, error
+        return draw["latency"], _injected_error(draw["roll"])
+
+    def generate_content(self, contents: Any, generation_config=None, request_options=None, **_kwargs):
+        delay, error = self._plan(request_options)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return _response(_canned(contents, generation_config), _prompt_text(contents))
+
+    async def generate_content_async(
+        self, contents: Any, generation_config=None, request_options=None, stream: bool = False, **_kwargs
+    ):
+        delay, error = self._plan(request_options)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        text = _canned(contents, generation_config)
+        if stream:
+            return _FakeStream(text, _prompt_text(contents))
+        return _response(text, _prompt_text(contents))
+
+
+def upload_file(path: Any = None, display_name: Optional[str] = None, mime_type: Optional[str] = None, **_kwargs):
+    """genai.upload_file 대체. 업로드하지 않고 파일 핸들 모양의 객체만 돌려준다."""
+    name = f"files/fake-{uuid.uuid4().hex[:12]}"
+    return SimpleNamespace(name=name, uri=f"fake://{name}", display_name=display_name, mime_type=mime_type)
+
+
+def delete_file(name: str) -> None:
+    """genai.delete_file 대체. 올린 파일이 없으므로 할 일이 없다."""
@@ -2,8 +2,8 @@
 
 from __future__ import annotations
 
-import base64
 import json
+import os
 import random
 import uuid
 from dataclasses import dataclass
@@ -12,13 +12,18 @@ from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
-import google.generativeai as genai
+from .llm import generate_json_async
+from .singleflight import AsyncSingleFlight, content_key
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_PATH = BASE_DIR.parent / "data" / "level_test_questions.json"
 
 SESSION_TTL = timedelta(hours=2)
+# 같은 조건으로 동시에 들어온 동적 문제 생성 요청은 LLM 호출 하나를 공유합니다.
+GENERATION_FLIGHT = AsyncSingleFlight()
 GENERATION_MODEL = "gemini-2.0-flash-lite-preview"
+# 26문항을 한 번에 만드는 호출이라 기본 LLM 마감 시간보다 여유를 둡니다.
+GENERATION_TIMEOUT = float(os.getenv("LEVEL_TEST_GENERATION_TIMEOUT", "60"))
 GENERATION_PROMPT = """
 You are a CELTA-qualified English teacher and assessment designer.
 Create {count} multiple-choice questions that evaluate learners according to the CEFR framework.
@@ -194,6 +199,11 @@ def create_session(questions: Iterable[LevelQuestion]) -> str:
     return session_id
 
 
+def active_session_count() -> int:
+    now = _now()
+    return sum(1 for data in list(_SESSIONS.values()) if data["expires"] >= now)
+
+
 def get_session_questions(session_id: Optional[str]) -> Optional[Dict[str, LevelQuestion]]:
     if not session_id:
         return None
@@ -209,35 +219,7 @@ def get_session_questions(session_id: Optional[str]) -> Optional[Dict[str, Level
 # --- 동적 문제 생성 ---------------------------------------------------
 
 
-def _extract_text_from_response(response) -> str:
-    text = getattr(response, "text", None)
-    if text:
-        return text
-    for cand in getattr(response, "candidates", []) or []:
-        content = getattr(cand, "content", None)
-        parts = getattr(content, "parts", []) if content else []
-        for part in parts:
-            if hasattr(part, "text") and part.text:
-                return part.text
-            inline = getattr(part, "inline_data", None)
-            if inline and getattr(inline, "data", None):
-                try:
-                    decoded = base64.b64decode(inline.data).decode("utf-8")
-                    return decoded
-                except Exception:  # pragma: no cover - 방어용 가드
-                    continue
-    return ""
-
-
-def _parse_generated_questions(raw: str) -> List[LevelQuestion]:
-    cleaned = (raw or "").strip()
-    cleaned = cleaned.replace("```json", "").replace("```", "").strip()
-    if not cleaned:
-        raise ValueError("빈 응답")
-    try:
-        payload = json.loads(cleaned)
-    except json.JSONDecodeError:
-        raise ValueError("JSON 파싱 실패")
+def _parse_generated_questions(payload: Dict[str, object]) -> List[LevelQuestion]:
     questions_data = payload.get("questions")
     if not isinstance(questions_data, list):
         raise ValueError("'questions' 배열이 필요합니다.")
@@ -262,19 +244,26 @@ def _parse_generated_questions(raw: str) -> List[LevelQuestion]:
     return results
 
 
+async def _request_dynamic_questions(prompt: str) -> List[LevelQuestion]:
+    payload = await generate_json_async(
+        GENERATION_MODEL,
+        prompt,
+        caller="level_test",
+        timeout=GENERATION_TIMEOUT,
+    )
+    return _parse_generated_questions(payload)
+
+
 async def generate_dynamic_questions(
     *, count: int = 26, skills: Optional[List[str]] = None
 ) -> List[LevelQuestion]:
     skills = skills or ["grammar", "vocabulary", "reading"]
     skills_clause = ", ".join(skills)
     prompt = GENERATION_PROMPT.format(count=count, skills_clause=skills_clause)
-    model = genai.GenerativeModel(GENERATION_MODEL)
-    response = await model.generate_content_async(
-        prompt,
-        generation_config={"response_mime_type": "application/json"},
-    )
-    raw_text = _extract_text_from_response(response)
-    questions = _parse_generated_questions(raw_text)
+    key = content_key("level_test", GENERATION_MODEL, prompt)
+    questions = await GENERATION_FLIGHT.do(key, _request_dynamic_questions, prompt)
+    # 공유된 결과를 받은 세션도 서로 다른 순서로 문제를 받도록 여기서 섞습니다.
+    questions = list(questions)
     random.shuffle(questions)
     return questions[:count]
 
@@ -0,0 +1,890 @@
+"""Shared Gemini client with a process-wide rate limit, priority admission and AIMD concurrency.
+
+모든 Gemini 호출은 generate / generate_async를 거친다. 토큰 버킷이 초당 요청 수를,
+LLMGovernor가 동시 실행 수를 제한하며 대기열에서는 대화형 요청이 배치 작업보다 먼저 슬롯을 받는다.
+429 응답이나 목표 지연 초과가 관측되면 동시 실행 한도를 줄이고(곱셈 감소),
+정상 응답이 이어지면 조금씩 늘린다(덧셈 증가).
+
+모든 호출에는 마감 시간(LLM_TIMEOUT)이 걸리고, 모델별 CircuitBreaker가 최근 실패율이
+높으면 호출 없이 CircuitOpenError로 즉시 실패시켜 호출자가 로컬/정적 대체 경로로 넘어가게 한다.
+비동기 호출은 LLM_HEDGE가 켜져 있으면 호출자별 p95 지연을 넘길 때 같은 요청을 한 번 더 보낸다.
+
+응답 파싱(response_text / response_json)과 JSON 호출(generate_json / generate_json_async)도
+여기서 한 번만 구현하며, 호출자별 호출 수·토큰 수·파싱 실패 수를 CALLER_STATS에 모은다.
+"""
+
+import ast
+import asyncio
+import base64
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+
+from . import fake_llm
+from .metrics import REGISTRY, LatencyRegistry
+from .tracing import record_span
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # pragma: no cover - google-generativeai가 api_core를 함께 설치한다
+    google_exceptions = None
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_DEFAULT: "default",
+    PRIORITY_BATCH: "batch",
+}
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").strip().lower()  # gemini | fake
+if LLM_BACKEND not in ("gemini", "fake"):
+    raise RuntimeError(f"알 수 없는 LLM_BACKEND: {LLM_BACKEND!r} (gemini 또는 fake)")
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", "5"))  # 0 이하면 속도 제한 없음
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_TARGET_LATENCY = float(os.getenv("LLM_TARGET_LATENCY", "8"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+LLM_THROTTLE_RETRIES = int(os.getenv("LLM_THROTTLE_RETRIES", "1"))
+LLM_THROTTLE_BACKOFF = float(os.getenv("LLM_THROTTLE_BACKOFF", "1.0"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# 이보다 긴 문자열에는 ast.literal_eval을 쓰지 않는다(느리고 깊은 중첩에서 스택을 소모한다).
+LLM_LITERAL_EVAL_MAX_CHARS = int(os.getenv("LLM_LITERAL_EVAL_MAX_CHARS", "2000"))
+JSON_MIME_TYPE = "application/json"
+
+
+class LLMQueueTimeout(RuntimeError):
+    """대기열에서 LLM_QUEUE_TIMEOUT 안에 실행 슬롯을 받지 못했을 때 발생한다."""
+
+
+class LLMParseError(ValueError):
+    """응답에서 기대한 형태의 JSON을 찾지 못했을 때 발생한다."""
+
+
+class CircuitOpenError(RuntimeError):
+    """회로가 열려 있어 업스트림을 호출하지 않고 바로 실패했을 때 발생한다."""
+
+
+def is_throttled(exc: BaseException) -> bool:
+    """업스트림이 429(ResourceExhausted)로 요청을 거절했는지 확인한다."""
+    if google_exceptions is not None and isinstance(exc, google_exceptions.TooManyRequests):
+        return True
+    return getattr(exc, "code", None) == 429
+
+
+def is_overloaded(exc: BaseException) -> bool:
+    """호출자가 500 대신 503으로 돌려줘야 하는 과부하 오류인지 확인한다."""
+    return isinstance(exc, (LLMQueueTimeout, CircuitOpenError)) or is_throttled(exc)
+
+
+def _is_upstream_failure(exc: BaseException) -> bool:
+    """회로 차단기에 실패로 집계할 오류인지 확인한다. 잘못된 요청(4xx)은 모델 상태와 무관하므로 제외한다."""
+    if is_throttled(exc):
+        return True
+    if google_exceptions is not None and isinstance(exc, google_exceptions.ClientError):
+        return False
+    return True
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 burst개까지 쌓이는 토큰 버킷. 잠금은 호출자가 잡는다."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """토큰을 하나 꺼내고 0을 돌려준다. 부족하면 꺼내지 않고 다음 토큰까지 남은 초를 돌려준다."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued", "event", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, priority: int, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+        self.cancelled = False
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMGovernor:
+    """토큰 버킷 + 우선순위 대기열 + AIMD 동시 실행 한도.
+
+    스레드(동기 호출)와 이벤트 루프(비동기 호출) 양쪽에서 같은 인스턴스를 공유한다.
+    """
+
+    def __init__(
+        self,
+        rate: float = LLM_RATE_PER_SEC,
+        burst: int = LLM_BURST,
+        initial: int = LLM_INITIAL_CONCURRENCY,
+        minimum: int = LLM_MIN_CONCURRENCY,
+        maximum: int = LLM_MAX_CONCURRENCY,
+        target_latency: float = LLM_TARGET_LATENCY,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._bucket = TokenBucket(rate, burst)
+        self._min = max(1, minimum)
+        self._max = max(self._min, maximum)
+        self._limit = float(min(self._max, max(self._min, initial)))
+        self._target_latency = target_latency
+        self._in_flight = 0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[threading.Timer] = None
+        self.queue_wait = LatencyRegistry()
+        self.latency = LatencyRegistry()
+        self.counters: Dict[str, int] = {
+            "admitted": 0,
+            "throttled": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "queue_timeouts": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+        }
+
+    # --- 슬롯 배분 ---
+    def _dispatch_locked(self) -> None:
+        while self._queue and self._in_flight < int(self._limit):
+            waiter = self._queue[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            delay = self._bucket.take()
+            if delay > 0:
+                self._schedule_locked(delay)
+                return
+            heapq.heappop(self._queue)
+            self._grant_locked(waiter)
+
+    def _grant_locked(self, waiter: _Waiter) -> None:
+        waiter.granted = True
+        self._in_flight += 1
+        self.counters["admitted"] += 1
+        self.queue_wait.observe(PRIORITY_NAMES.get(waiter.priority, str(waiter.priority)), time.perf_counter() - waiter.enqueued)
+        if waiter.future is None:
+            waiter.event.set()
+        else:
+            waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def _schedule_locked(self, delay: float) -> None:
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch_locked()
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        with self._lock:
+            heapq.heappush(self._queue, (waiter.priority, next(self._seq), waiter))
+            self._dispatch_locked()
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """대기를 포기한다. 그 사이 이미 슬롯을 받았다면 True를 돌려준다."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+            return False
+
+    # --- 공개 API ---
+    def acquire(self, priority: int = PRIORITY_DEFAULT, timeout: float = LLM_QUEUE_TIMEOUT) -> None:
+        waiter = _Waiter(priority)
+        self._enqueue(waiter)
+        if waiter.event.wait(timeout) or self._abandon(waiter):
+            return
+        with self._lock:
+            self.counters["queue_timeouts"] += 1
+        raise LLMQueueTimeout(f"LLM 대기열에서 {timeout:g}초 안에 슬롯을 받지 못했습니다.")
+
+    async def acquire_async(self, priority: int = PRIORITY_DEFAULT, timeout: float = LLM_QUEUE_TIMEOUT) -> None:
+        waiter = _Waiter(priority, loop=asyncio.get_running_loop())
+        self._enqueue(waiter)
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                return
+            with self._lock:
+                self.counters["queue_timeouts"] += 1
+            raise LLMQueueTimeout(f"LLM 대기열에서 {timeout:g}초 안에 슬롯을 받지 못했습니다.") from None
+        except asyncio.CancelledError:
+            # 클라이언트 연결이 끊긴 경우: 이미 받은 슬롯은 돌려준다.
+            if self._abandon(waiter):
+                self.release(None, None, "cancelled")
+            raise
+
+    def release(self, caller: Optional[str], latency: Optional[float], outcome: str = "ok") -> None:
+        """슬롯을 반납하고 결과에 따라 동시 실행 한도를 조정한다.
+
+        outcome: ok | throttled | timeout | error | cancelled
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if outcome == "throttled":
+                self.counters["throttled"] += 1
+                self._limit = max(self._min, self._limit / 2)
+            elif outcome == "timeout":
+                self.counters["timeouts"] += 1
+                self._limit = max(self._min, self._limit * 0.9)
+            elif outcome == "ok" and latency is not None:
+                if latency > self._target_latency:
+                    self._limit = max(self._min, self._limit * 0.9)
+                else:
+                    # 한도만큼 성공하면 한도가 1 늘어나는 덧셈 증가
+                    self._limit = min(self._max, self._limit + 1 / self._limit)
+            elif outcome == "error":
+                self.counters["errors"] += 1
+            self._dispatch_locked()
+        if caller and latency is not None and outcome == "ok":
+            self.latency.observe(caller, latency)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def state(self) -> Dict[str, Any]:
+        """백분위수 계산 없이 현재 한도·실행 수·대기열 길이·카운터만 돌려준다."""
+        with self._lock:
+            return {
+                "limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "queued": sum(1 for _, _, waiter in self._queue if not waiter.cancelled),
+                "rate_per_sec": self._bucket.rate,
+                **self.counters,
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state()
+        state["queue_wait"] = self.queue_wait.snapshot()
+        state["latency"] = self.latency.snapshot()
+        return state
+
+
+class CircuitBreaker:
+    """최근 window개 호출의 실패율이 기준을 넘으면 cooldown 동안 호출을 막는 회로 차단기.
+
+    cooldown이 지나면 half_open 상태에서 한 번의 시험 호출만 통과시키고,
+    성공하면 닫히고 실패하면 다시 열린다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = LLM_BREAKER_WINDOW,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        failure_rate: float = LLM_BREAKER_FAILURE_RATE,
+        cooldown: float = LLM_BREAKER_COOLDOWN,
+    ) -> None:
+        self.name = name
+        self._results: deque = deque(maxlen=max(1, window))
+        self._min_calls = max(1, min_calls)
+        self._failure_rate = failure_rate
+        self._cooldown = cooldown
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == "open":
+                remaining = self._cooldown - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} 회로가 열려 있습니다({remaining:.1f}초 후 재시도).")
+                self._state = "half_open"
+            if self._state == "half_open":
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} 회로 시험 호출이 진행 중입니다.")
+                self._probing = True
+
+    def record(self, success: Optional[bool]) -> None:
+        """호출 결과를 기록한다. None은 집계하지 않는 결과(취소, 잘못된 요청)."""
+        with self._lock:
+            if self._state == "half_open":
+                self._probing = False
+                if success is True:
+                    self._state = "closed"
+                    self._results.clear()
+                elif success is False:
+                    self._trip_locked()
+                return
+            if success is None or self._state == "open":
+                return
+            self._results.append(success)
+            failures = self._results.count(False)
+            if len(self._results) >= self._min_calls and failures / len(self._results) >= self._failure_rate:
+                self._trip_locked()
+
+    def _trip_locked(self) -> None:
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        self.opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state, "opened": self.opened, "rejected": self.rejected}
+
+
+class CallerStats:
+    """호출자별 성공 호출 수, 입력/출력 토큰 수, 파싱 실패 수."""
+
+    FIELDS = ("calls", "prompt_tokens", "output_tokens", "parse_failures")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def add(self, caller: str, **counts: int) -> None:
+        with self._lock:
+            row = self._counts.setdefault(caller, dict.fromkeys(self.FIELDS, 0))
+            for name, value in counts.items():
+                row[name] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {caller: dict(row) for caller, row in self._counts.items()}
+
+
+GOVERNOR = LLMGovernor()
+CALLER_STATS = CallerStats()
+
+# --- /metrics ---
+LLM_CALLS = REGISTRY.counter(
+    "llm_calls_total", "모델·호출자·결과(ok|throttled|timeout|error|cancelled)별 LLM 호출 수", ("model", "caller", "outcome")
+)
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "llm_call_duration_seconds", "모델·호출자별 LLM 호출 시간(대기열 대기 제외)", ("model", "caller")
+)
+REGISTRY.gauge("llm_concurrency_limit", "AIMD가 조정한 현재 동시 실행 한도", callback=lambda: GOVERNOR.state()["limit"])
+REGISTRY.gauge("llm_in_flight", "실행 중인 LLM 호출 수", callback=lambda: GOVERNOR.state()["in_flight"])
+REGISTRY.gauge("llm_queued", "슬롯을 기다리는 LLM 호출 수", callback=lambda: GOVERNOR.state()["queued"])
+REGISTRY.counter(
+    "llm_governor_events_total",
+    "거버너 이벤트 수(admitted, throttled, timeouts, errors, queue_timeouts, hedged, hedge_wins)",
+    ("event",),
+    callback=lambda: {(name,): value for name, value in GOVERNOR.state().items() if name in GOVERNOR.counters},
+)
+
+
+def _observe_call(model_name: str, caller: str, latency: float, outcome: str, queue_wait: float) -> None:
+    LLM_CALLS.inc(model=model_name, caller=caller, outcome=outcome)
+    if outcome != "cancelled":
+        LLM_CALL_SECONDS.observe(latency, model=model_name, caller=caller)
+    record_span(
+        "llm.generate",
+        latency,
+        error=None if outcome == "ok" else outcome,
+        model=model_name,
+        caller=caller,
+        queue_ms=round(queue_wait * 1000, 2),
+    )
+
+_MODELS: Dict[Tuple[str, Optional[str]], Any] = {}
+_MODELS_LOCK = threading.Lock()
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def uses_fake_backend() -> bool:
+    return LLM_BACKEND == "fake"
+
+
+def get_model(model_name: str, system_instruction: Optional[str] = None):
+    """모델 핸들을 (이름, 시스템 프롬프트)별로 한 번만 만든다. LLM_BACKEND=fake이면 FakeModel을 쓴다."""
+    key = (model_name, system_instruction)
+    with _MODELS_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            factory = fake_llm.FakeModel if uses_fake_backend() else genai.GenerativeModel
+            model = _MODELS[key] = factory(model_name, system_instruction=system_instruction)
+        return model
+
+
+def upload_file(**kwargs: Any):
+    """genai.upload_file과 같으나 가짜 백엔드에서는 실제 업로드를 하지 않는다."""
+    if uses_fake_backend():
+        return fake_llm.upload_file(**kwargs)
+    return genai.upload_file(**kwargs)
+
+
+def delete_file(name: str) -> None:
+    """upload_file로 올린 파일을 지운다. 가짜 백엔드에서는 아무것도 하지 않는다."""
+    if uses_fake_backend():
+        fake_llm.delete_file(name)
+        return
+    genai.delete_file(name)
+
+
+def get_breaker(model_name: str) -> CircuitBreaker:
+    with _MODELS_LOCK:
+        breaker = _BREAKERS.get(model_name)
+        if breaker is None:
+            breaker = _BREAKERS[model_name] = CircuitBreaker(model_name)
+        return breaker
+
+
+def _breaker_values(field: str) -> Dict[Tuple[str], float]:
+    with _MODELS_LOCK:
+        breakers = list(_BREAKERS.items())
+    values = {}
+    for name, breaker in breakers:
+        snap = breaker.snapshot()
+        values[(name,)] = (snap["state"] != "closed") if field == "open" else snap[field]
+    return values
+
+
+REGISTRY.gauge("llm_circuit_open", "모델별 회로 차단기가 열려(half_open 포함) 있으면 1", ("model",), callback=lambda: _breaker_values("open"))
+REGISTRY.counter("llm_circuit_rejected_total", "회로가 열려 호출 없이 거절된 수", ("model",), callback=lambda: _breaker_values("rejected"))
+
+
+def _backoff(attempt: int) -> float:
+    return LLM_THROTTLE_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _classify(exc: BaseException) -> str:
+    if is_throttled(exc):
+        return "throttled"
+    if isinstance(exc, TimeoutError) or (
+        google_exceptions is not None and isinstance(exc, google_exceptions.DeadlineExceeded)
+    ):
+        return "timeout"
+    return "error"
+
+
+def _request_kwargs(kwargs: Dict[str, Any], timeout: Optional[float]) -> Tuple[float, Dict[str, Any]]:
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    request_options = {"timeout": timeout, **(kwargs.pop("request_options", None) or {})}
+    return timeout, {**kwargs, "request_options": request_options}
+
+
+def generate(
+    model_name: str,
+    contents: Any,
+    *,
+    caller: str,
+    priority: int = PRIORITY_DEFAULT,
+    system_instruction: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+):
+    """GOVERNOR의 슬롯을 받아 generate_content를 호출한다. 429는 LLM_THROTTLE_RETRIES번까지 재시도한다.
+
+    회로가 열려 있으면 CircuitOpenError, 마감 시간을 넘기면 업스트림의 시간 초과 오류가 발생한다.
+    """
+    breaker = get_breaker(model_name)
+    breaker.before_call()
+    model = get_model(model_name, system_instruction)
+    _timeout, kwargs = _request_kwargs(kwargs, timeout)
+    for attempt in range(LLM_THROTTLE_RETRIES + 1):
+        queued = time.perf_counter()
+        try:
+            GOVERNOR.acquire(priority)
+        except BaseException:
+            breaker.record(None)
+            raise
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            response = model.generate_content(contents, **kwargs)
+            outcome = "ok"
+            return response
+        except Exception as exc:
+            outcome = _classify(exc)
+            if outcome != "throttled" or attempt >= LLM_THROTTLE_RETRIES:
+                breaker.record(False if _is_upstream_failure(exc) else None)
+                raise
+        finally:
+            latency = time.perf_counter() - started
+            GOVERNOR.release(caller, latency, outcome)
+            _observe_call(model_name, caller, latency, outcome, started - queued)
+            if outcome == "ok":
+                breaker.record(True)
+                _record_usage(caller, response)
+            elif outcome == "cancelled":
+                breaker.record(None)
+        time.sleep(_backoff(attempt))
+
+
+async def _call_async(
+    model,
+    contents: Any,
+    caller: str,
+    priority: int,
+    breaker: CircuitBreaker,
+    timeout: float,
+    kwargs: Dict[str, Any],
+):
+    for attempt in range(LLM_THROTTLE_RETRIES + 1):
+        queued = time.perf_counter()
+        try:
+            await GOVERNOR.acquire_async(priority)
+        except BaseException:
+            breaker.record(None)
+            raise
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            # request_options의 timeout과 별개로 이벤트 루프 쪽에서도 마감 시간을 강제한다.
+            response = await asyncio.wait_for(model.generate_content_async(contents, **kwargs), timeout)
+            outcome = "ok"
+            return response
+        except Exception as exc:
+            outcome = _classify(exc)
+            if outcome != "throttled" or attempt >= LLM_THROTTLE_RETRIES:
+                breaker.record(False if _is_upstream_failure(exc) else None)
+                raise
+        finally:
+            latency = time.perf_counter() - started
+            GOVERNOR.release(caller, latency, outcome)
+            _observe_call(breaker.name, caller, latency, outcome, started - queued)
+            if outcome == "ok":
+                breaker.record(True)
+                _record_usage(caller, response)
+            elif outcome == "cancelled":
+                breaker.record(None)
+        await asyncio.sleep(_backoff(attempt))
+
+
+def _hedge_delay(caller: str) -> Optional[float]:
+    window = GOVERNOR.latency.window(caller)
+    if len(window) < LLM_HEDGE_MIN_SAMPLES:
+        return None
+    return window.quantile(LLM_HEDGE_QUANTILE)
+
+
+async def _hedged(call, delay: float):
+    """call()을 실행하고 delay 안에 끝나지 않으면 같은 호출을 하나 더 보내 먼저 성공한 결과를 쓴다."""
+    primary = asyncio.ensure_future(call())
+    pending = {primary}
+    error: Optional[BaseException] = None
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+        GOVERNOR.count("hedged")
+        hedge = asyncio.ensure_future(call())
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = None
+            for task in done:
+                exc = task.exception()
+                if exc is not None:
+                    error = error or exc
+                elif winner is None:
+                    winner = task
+            if winner is not None:
+                if winner is hedge:
+                    GOVERNOR.count("hedge_wins")
+                return winner.result()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def generate_async(
+    model_name: str,
+    contents: Any,
+    *,
+    caller: str,
+    priority: int = PRIORITY_DEFAULT,
+    system_instruction: Optional[str] = None,
+    timeout: Optional[float] = None,
+    hedge: Optional[bool] = None,
+    **kwargs: Any,
+):
+    """generate의 비동기 버전. hedge(기본 LLM_HEDGE)가 켜져 있으면 p95 지연 이후 중복 요청을 보낸다."""
+    breaker = get_breaker(model_name)
+    breaker.before_call()
+    model = get_model(model_name, system_instruction)
+    timeout, kwargs = _request_kwargs(kwargs, timeout)
+
+    def call():
+        return _call_async(model, contents, caller, priority, breaker, timeout, kwargs)
+
+    delay = _hedge_delay(caller) if (LLM_HEDGE if hedge is None else hedge) else None
+    if delay is None:
+        return await call()
+    return await _hedged(call, delay)
+
+
+async def stream_async(
+    model_name: str,
+    contents: Any,
+    *,
+    caller: str,
+    priority: int = PRIORITY_DEFAULT,
+    system_instruction: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """generate_async의 스트리밍 버전. 응답 텍스트를 생성되는 대로 조각 단위로 내보낸다.
+
+    슬롯은 스트림이 끝날 때까지 잡고 있고, 마감 시간은 스트림 전체에 적용한다.
+    429 재시도는 첫 조각을 내보내기 전까지만 하며 hedge는 쓰지 않는다.
+    """
+    breaker = get_breaker(model_name)
+    breaker.before_call()
+    model = get_model(model_name, system_instruction)
+    timeout, kwargs = _request_kwargs(kwargs, timeout)
+    for attempt in range(LLM_THROTTLE_RETRIES + 1):
+        queued = time.perf_counter()
+        try:
+            await GOVERNOR.acquire_async(priority)
+        except BaseException:
+            breaker.record(None)
+            raise
+        started = time.perf_counter()
+        deadline = started + timeout
+        outcome = "cancelled"
+        last_chunk = None
+        emitted = False
+        try:
+            response = await asyncio.wait_for(model.generate_content_async(contents, stream=True, **kwargs), timeout)
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.perf_counter()))
+                except StopAsyncIteration:
+                    break
+                last_chunk = chunk
+                text = response_text(chunk)
+                if text:
+                    emitted = True
+                    yield text
+            outcome = "ok"
+            return
+        except Exception as exc:
+            outcome = _classify(exc)
+            if outcome != "throttled" or emitted or attempt >= LLM_THROTTLE_RETRIES:
+                breaker.record(False if _is_upstream_failure(exc) else None)
+                raise
+        finally:
+            latency = time.perf_counter() - started
+            GOVERNOR.release(caller, latency, outcome)
+            _observe_call(breaker.name, caller, latency, outcome, started - queued)
+            if outcome == "ok":
+                breaker.record(True)
+                # 스트림의 사용량은 마지막 조각에 누적되어 온다.
+                _record_usage(caller, last_chunk)
+            elif outcome == "cancelled":
+                breaker.record(None)
+        await asyncio.sleep(_backoff(attempt))
+
+
+# --- 응답 파싱 ---
+def _record_usage(caller: str, response: Any) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    CALLER_STATS.add(
+        caller,
+        calls=1,
+        prompt_tokens=int(getattr(usage, "prompt_token_count", 0) or 0),
+        output_tokens=int(getattr(usage, "candidates_token_count", 0) or 0),
+    )
+
+
+def _iter_parts(response: Any):
+    for cand in getattr(response, "candidates", None) or []:
+        content = getattr(cand, "content", None)
+        yield from (getattr(content, "parts", None) or []) if content else []
+
+
+def _inline_text(inline: Any) -> Optional[str]:
+    data = getattr(inline, "data", None)
+    if not data:
+        return None
+    try:
+        raw = base64.b64decode(data) if isinstance(data, str) else data
+        return raw.decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def response_text(response: Any) -> str:
+    """응답의 텍스트를 돌려준다. response.text가 없거나 막힌 응답이면 파트를 직접 훑는다."""
+    try:
+        text = response.text
+    except (AttributeError, ValueError):
+        text = None
+    if text:
+        return text
+    chunks = []
+    for part in _iter_parts(response):
+        if getattr(part, "text", None):
+            chunks.append(part.text)
+        elif getattr(part, "inline_data", None) is not None:
+            decoded = _inline_text(part.inline_data)
+            if decoded:
+                chunks.append(decoded)
+    return "".join(chunks)
+
+
+def _strip_fence(text: str) -> str:
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("\n", 1)[1] if "\n" in cleaned else cleaned[3:]
+        if cleaned.rstrip().endswith("```"):
+            cleaned = cleaned.rstrip()[:-3]
+    return cleaned.strip()
+
+
+def parse_json(raw: str) -> Any:
+    """JSON 문자열을 파싱한다. 코드 펜스나 앞뒤 설명문이 붙은 응답도 허용한다."""
+    cleaned = _strip_fence(raw or "")
+    if not cleaned:
+        raise LLMParseError("빈 응답")
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+    candidate = cleaned
+    start = cleaned.find("{")
+    end = cleaned.rfind("}")
+    if start != -1 and end > start:
+        candidate = cleaned[start:end + 1]
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+    # 작은따옴표 딕셔너리 같은 파이썬 리터럴은 짧은 응답에서만 허용한다.
+    if len(candidate) <= LLM_LITERAL_EVAL_MAX_CHARS:
+        try:
+            return ast.literal_eval(candidate)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    raise LLMParseError("JSON 파싱 실패")
+
+
+def _json_candidates(response: Any):
+    yield response_text(response)
+    for part in _iter_parts(response):
+        inline = getattr(part, "inline_data", None)
+        if inline is not None and getattr(inline, "mime_type", "").startswith(JSON_MIME_TYPE):
+            decoded = _inline_text(inline)
+            if decoded:
+                yield decoded
+        if getattr(part, "text", None):
+            yield part.text
+
+
+def response_json(response: Any, *, caller: Optional[str] = None, expect: type = dict) -> Any:
+    """응답에서 expect 타입의 JSON 값을 꺼낸다. 실패하면 LLMParseError를 던지고 caller의 파싱 실패를 집계한다."""
+    for part in _iter_parts(response):
+        call = getattr(part, "function_call", None)
+        args = getattr(call, "args", None) if call else None
+        if args and expect is dict:
+            return dict(args)
+    seen = set()
+    for candidate in _json_candidates(response):
+        if not candidate or candidate in seen:
+            continue
+        seen.add(candidate)
+        try:
+            value = parse_json(candidate)
+        except LLMParseError:
+            continue
+        if isinstance(value, expect):
+            return value
+    if caller:
+        CALLER_STATS.add(caller, parse_failures=1)
+    raise LLMParseError("LLM 응답에서 JSON을 찾지 못했습니다.")
+
+
+def _json_config(generation_config: Optional[Dict[str, Any]], schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    config = {**(generation_config or {}), "response_mime_type": JSON_MIME_TYPE}
+    if schema is not None:
+        config["response_schema"] = schema
+    return config
+
+
+def generate_json(
+    model_name: str,
+    contents: Any,
+    *,
+    caller: str,
+    schema: Optional[Dict[str, Any]] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+    expect: type = dict,
+    **kwargs: Any,
+) -> Any:
+    """JSON 응답 모드(선택적으로 response_schema)로 호출하고 파싱된 값을 돌려준다."""
+    response = generate(
+        model_name, contents, caller=caller, generation_config=_json_config(generation_config, schema), **kwargs
+    )
+    return response_json(response, caller=caller, expect=expect)
+
+
+async def generate_json_async(
+    model_name: str,
+    contents: Any,
+    *,
+    caller: str,
+    schema: Optional[Dict[str, Any]] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+    expect: type = dict,
+    **kwargs: Any,
+) -> Any:
+    """generate_json의 비동기 버전."""
+    response = await generate_async(
+        model_name, contents, caller=caller, generation_config=_json_config(generation_config, schema), **kwargs
+    )
+    return response_json(response, caller=caller, expect=expect)
+
+
+def llm_stats() -> Dict[str, Any]:
+    with _MODELS_LOCK:
+        breakers = dict(_BREAKERS)
+    return {
+        **GOVERNOR.snapshot(),
+        "breakers": {name: b.snapshot() for name, b in breakers.items()},
+        "callers": CALLER_STATS.snapshot(),
+    }
@@ -0,0 +1,156 @@
+"""Local heuristic summarizer and question generator (no network, no LLM).
+
+문장 점수 기반 추출 요약, 문장 단위 TF-IDF 키워드, 템플릿 질문 생성을 제공하며
+providers.py의 SummaryProvider / QuestionProvider 프로토콜을 그대로 따른다.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+from .providers import HeuristicQuestionProvider, HeuristicSummaryProvider, QuestionProvider, SummaryProvider
+from .stopwords import STOPWORDS
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?。！？])\s+|\n+")
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z'\-]*[A-Za-z]|[가-힣]{2,}")
+_NAME_RE = re.compile(r"\b([A-Z][a-z]+(?:[ ]+[A-Z][a-z]+)+)\b")
+# 한국어 어절 끝의 흔한 조사는 떼어 내어 같은 단어로 집계합니다.
+_KO_PARTICLES = ("에서는", "으로", "에서", "에게", "까지", "부터", "은", "는", "이", "가", "을", "를", "의", "에", "로", "와", "과", "도", "만")
+
+QUESTION_TEMPLATES = {
+    "factual": [
+        "According to the text, what is said about {topic}?",
+        "What key facts does the text give about {topic}?",
+        "How does the text describe the role of {topic}?",
+    ],
+    "inferential": [
+        "Why do you think the author focuses on {topic}?",
+        "What can you infer about the relationship between {topic} and {other}?",
+        "What might happen next regarding {topic}, based on the text?",
+    ],
+    "evaluative": [
+        "Do you agree with the way the text presents {topic}? Why or why not?",
+        "How would you respond if you were personally affected by {topic}?",
+        "Is {topic} an important issue in your community? Explain your view.",
+    ],
+}
+_QUESTION_ORDER = ("factual", "inferential", "evaluative")
+# 기사에서 자주 나오지만 주제어로는 의미가 없는 단어들
+_EXTRA_STOPWORDS = {
+    'said', 'says', 'say', 'one', 'two', 'first', 'also', 'would', 'could', 'may', 'might', 'many',
+    'much', 'new', 'like', 'get', 'got', 'make', 'made', 'well', 'even', 'still', 'year', 'years',
+    'time', 'week', 'day', 'already', 'people', 'thing', 'things', 'way', 'told', 'according', 'since', 'around',
+    '있다', '했다', '밝혔다', '말했다', '것으로', '이번', '현재', '관계자', '위해', '대한',
+}
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text or "") if len(s.strip()) > 1]
+
+
+def _normalize_token(token: str) -> str:
+    token = token.lower().strip("'-")
+    if token and "가" <= token[0] <= "힣":
+        for particle in _KO_PARTICLES:
+            if token.endswith(particle) and len(token) > len(particle):
+                return token[: -len(particle)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for raw in _TOKEN_RE.findall(text or ""):
+        token = _normalize_token(raw)
+        if token in STOPWORDS or token in _EXTRA_STOPWORDS:
+            continue
+        if len(token) < (2 if "가" <= token[0] <= "힣" else 3):
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def _tfidf_weights(sentences: List[List[str]]) -> Dict[str, float]:
+    """문장을 문서로 보고 전체 텍스트에서의 TF × 문장 IDF 가중치를 계산한다."""
+    term_freq: Counter = Counter()
+    doc_freq: Counter = Counter()
+    for tokens in sentences:
+        term_freq.update(tokens)
+        doc_freq.update(set(tokens))
+    n_docs = len(sentences) or 1
+    total = sum(term_freq.values()) or 1
+    return {
+        term: (count / total) * (math.log((1 + n_docs) / (1 + doc_freq[term])) + 1.0)
+        for term, count in term_freq.items()
+    }
+
+
+def extract_keywords(text: str, top_k: int = 5) -> List[str]:
+    tokenized = [tokenize(sentence) for sentence in split_sentences(text)]
+    weights = _tfidf_weights(tokenized)
+    ranked = sorted(weights.items(), key=lambda item: (-item[1], item[0]))
+    return [term for term, _ in ranked[:top_k]]
+
+
+def summarize(text: str, max_sentences: int = 2) -> str:
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+    tokenized = [tokenize(sentence) for sentence in sentences]
+    weights = _tfidf_weights(tokenized)
+    scored = []
+    for idx, tokens in enumerate(tokenized):
+        if not tokens:
+            continue
+        score = sum(weights[t] for t in tokens) / math.sqrt(len(tokens))
+        # 기사 특성상 앞부분 문장에 핵심이 몰려 있으므로 위치 가중치를 줍니다.
+        score *= 1.0 + 0.5 / (1 + idx)
+        scored.append((score, idx))
+    chosen = sorted(idx for _, idx in sorted(scored, reverse=True)[:max_sentences])
+    return " ".join(sentences[idx] for idx in chosen)
+
+
+def extract_entities(text: str) -> Dict[str, List[str]]:
+    counts = Counter(match for match in _NAME_RE.findall(text or ""))
+    return {"names": [name for name, _ in counts.most_common(5)]}
+
+
+def generate_questions(topics: List[str], summary: str, entities: Dict, max_q: int = 5) -> List[str]:
+    """사실 확인 → 추론 → 평가 순서로 돌아가며 토픽을 템플릿에 채워 질문을 만든다."""
+    if max_q <= 0:
+        return []
+    subjects = list(dict.fromkeys((entities or {}).get("names", [])[:2] + list(topics or [])))
+    if not subjects:
+        subjects = ["this topic"]
+    questions: List[str] = []
+    seen = set()
+    attempt = 0
+    while len(questions) < max_q and attempt < max_q * 4:
+        kind = _QUESTION_ORDER[attempt % len(_QUESTION_ORDER)]
+        templates = QUESTION_TEMPLATES[kind]
+        topic = subjects[attempt % len(subjects)]
+        other = subjects[(attempt + 1) % len(subjects)] if len(subjects) > 1 else "the main issue"
+        question = templates[(attempt // len(_QUESTION_ORDER)) % len(templates)].format(topic=topic, other=other)
+        attempt += 1
+        if question in seen:
+            continue
+        seen.add(question)
+        questions.append(question)
+    if summary and len(questions) < max_q:
+        questions.append("Can you summarize the main point of the text in your own words?")
+    return questions[:max_q]
+
+
+SUMMARY_PROVIDER: SummaryProvider = HeuristicSummaryProvider(summarize)
+QUESTION_PROVIDER: QuestionProvider = HeuristicQuestionProvider(generate_questions)
+
+
+def analyze_local(text: str, max_questions: int = 5) -> Dict[str, object]:
+    """analyze()와 같은 형태의 결과를 로컬 휴리스틱만으로 만든다."""
+    if not text:
+        return {"summary": "", "topics": [], "questions": []}
+    summary = SUMMARY_PROVIDER.summarize(text, max_sentences=3)
+    topics = extract_keywords(text, top_k=5)
+    meta = {"summary": summary, "entities": extract_entities(text)}
+    questions = QUESTION_PROVIDER.questions(text, topics, meta, max_q=max_questions)
+    return {"summary": summary, "topics": topics, "questions": questions}
@@ -0,0 +1,308 @@
+"""In-process metrics helpers shared by the text and voice services.
+
+LatencyWindow / LatencyRegistry는 /llm/stats 같은 JSON 통계용이고,
+Counter / Gauge / Histogram과 REGISTRY는 /metrics의 Prometheus 텍스트 형식 노출용이다.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _nearest_rank(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class LatencyWindow:
+    """최근 size개의 지연 시간(초)을 보관하고 백분위수를 계산한다."""
+
+    def __init__(self, size: int = 1024) -> None:
+        self._samples: deque = deque(maxlen=size)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """최근 샘플의 q 백분위수(초). 샘플이 없으면 None."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        return _nearest_rank(ordered, q)
+
+    def percentiles(self, quantiles: Iterable[float] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+        with self._lock:
+            ordered = sorted(self._samples)
+            count = self._count
+        result: Dict[str, Optional[float]] = {"count": count}
+        for q in quantiles:
+            value = _nearest_rank(ordered, q)
+            result[f"p{q:g}_ms"] = None if value is None else round(value * 1000, 2)
+        return result
+
+
+class LatencyRegistry:
+    """이름별 LatencyWindow 모음."""
+
+    def __init__(self, size: int = 1024) -> None:
+        self._size = size
+        self._windows: Dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    def window(self, name: str) -> LatencyWindow:
+        with self._lock:
+            window = self._windows.get(name)
+            if window is None:
+                window = self._windows[name] = LatencyWindow(self._size)
+            return window
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.window(name).observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        with self._lock:
+            items = list(self._windows.items())
+        return {name: window.percentiles() for name, window in items}
+
+
+# --- Prometheus 텍스트 노출 형식 ---
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[str, ...]
+# 콜백은 라벨이 없으면 숫자, 있으면 {라벨 값 튜플: 숫자}를 돌려준다.
+MetricCallback = Callable[[], Any]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs)
+    return "{" + body + "}" if body else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        callback: Optional[MetricCallback] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: LabelKey = tuple(labelnames)
+        self._callback = callback
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: labels {sorted(labels)} != {list(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[Tuple[str, LabelKey, float]]:
+        if self._callback is not None:
+            value = self._callback()
+            items = value.items() if isinstance(value, dict) else [((), value)]
+            return [("", tuple(str(v) for v in key), float(val)) for key, val in items]
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        documentation = self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, value in self._samples():
+            pairs = list(zip(self.labelnames, key))
+            if suffix == "_bucket":
+                pairs.append(("le", key[-1]))
+            lines.append(f"{self.name}{suffix}{_label_text(pairs)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # 라벨별 [버킷별 개수(누적 아님)..., +Inf 개수, 합계]
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        samples: List[Tuple[str, LabelKey, float]] = []
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(bounds, series[:-1]):
+                cumulative += count
+                samples.append(("_bucket", key + (bound,), cumulative))
+            samples.append(("_sum", key, series[-1]))
+            samples.append(("_count", key, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """이름별 메트릭 모음. 같은 이름으로 다시 등록하면 기존 메트릭을 돌려준다."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args: Any, **kwargs: Any):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = (), callback: Optional[MetricCallback] = None) -> Counter:
+        return self._register(Counter, name, documentation, labelnames, callback)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (), callback: Optional[MetricCallback] = None) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames, callback)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as exc:  # pragma: no cover - 콜백 하나가 전체 스크레이프를 막지 않도록
+                print(f"[metrics] {metric.name} render failed: {exc}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --- HTTP 미들웨어 ---
+def route_template(scope: Dict[str, Any]) -> str:
+    """라우팅이 끝난 scope에서 경로 템플릿(/records/{record_id})을 찾는다. 라벨 수가 경로 값만큼 늘지 않게 한다."""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "<unmatched>"
+    for route in getattr(app, "routes", ()):
+        if getattr(route, "endpoint", None) is endpoint:
+            return getattr(route, "path", "<unmatched>")
+    return "<unmatched>"
+
+
+class HTTPMetricsMiddleware:
+    """라우트별 요청 수와 지연 시간을 기록하는 ASGI 미들웨어. 스트리밍 응답은 본문 전송이 끝날 때까지 잰다."""
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY) -> None:
+        self.app = app
+        self.requests = registry.counter(
+            "http_requests_total", "라우트·메서드·상태 코드별 HTTP 요청 수", ("method", "route", "status")
+        )
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "라우트·메서드별 HTTP 처리 시간", ("method", "route")
+        )
+        self.in_progress = registry.gauge("http_requests_in_progress", "처리 중인 HTTP 요청 수")
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_progress.dec()
+            route = route_template(scope)
+            method = scope.get("method", "")
+            self.duration.observe(time.perf_counter() - started, method=method, route=route)
+            self.requests.inc(method=method, route=route, status=status)
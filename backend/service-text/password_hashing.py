@@ -0,0 +1,68 @@
+"""Bounded process pool for password hashing so login bursts don't pin API threads on the KDF."""
+
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from .process_pool import BoundedProcessPool, PoolBusyError
+
+# passlib의 pbkdf2_sha256 기본값(29000)과 같게 두었습니다. 바꾸면 다음 로그인 때 해시가 새 값으로 갱신됩니다.
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+# 0이면 프로세스를 띄우지 않고 스레드에서 계산합니다.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(1, PASSWORD_HASH_WORKERS) * 16)))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+
+@lru_cache(maxsize=None)
+def crypt_context(rounds: int) -> CryptContext:
+    """rounds로 해시하고, rounds가 다른 기존 해시는 갱신 대상으로 보는 컨텍스트."""
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    )
+
+
+# --- 워커 프로세스에서 실행되는 함수 (피클 가능하도록 모듈 최상위에 둔다) ---
+def hash_password(password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def verify_and_update(password: str, hashed: str, rounds: int = PASSWORD_HASH_ROUNDS) -> Tuple[bool, Optional[str]]:
+    """(일치 여부, 갱신할 새 해시 또는 None). 알 수 없는 형식의 해시는 불일치로 본다."""
+    try:
+        return crypt_context(rounds).verify_and_update(password, hashed)
+    except ValueError:
+        return False, None
+
+
+class HashBusyError(PoolBusyError):
+    """해시 대기열이 가득 차서 새 작업을 받을 수 없을 때 발생한다."""
+
+
+class PasswordHasher(BoundedProcessPool):
+    """해시 계산을 별도 프로세스에서 실행한다.
+
+    PBKDF2는 수십 ms 동안 CPU를 쓰므로 스레드풀에서 돌리면 로그인이 몰릴 때
+    다른 동기 라우트가 워커를 받지 못한다.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float, rounds: int) -> None:
+        super().__init__("password_hash", workers, max_pending, timeout, busy_error=HashBusyError)
+        self.rounds = rounds
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self.run(verify_and_update, password, hashed, self.rounds)
+
+
+PASSWORD_HASHER = PasswordHasher(
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT, PASSWORD_HASH_ROUNDS
+)
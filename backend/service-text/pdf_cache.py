@@ -0,0 +1,42 @@
+"""Disk cache for rendered record PDFs, keyed by (record_id, record content, renderer version)."""
+
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from .disk_cache import DiskLRUCache
+from .records import DATA_DIR, PDF_RENDERER_VERSION
+from .singleflight import content_key
+
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", str(DATA_DIR / "pdf_cache")))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+PDF_CACHE = DiskLRUCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, suffix=".pdf")
+
+
+def _version_digest(record: Dict) -> str:
+    # updated_at은 초 단위라 같은 초에 두 번 저장하면 구분되지 않으므로 기록 내용 전체를 해시합니다.
+    return content_key("pdf", PDF_RENDERER_VERSION, record)[:16]
+
+
+def _cache_key(record: Dict) -> str:
+    return f"{record['id']}.{_version_digest(record)}"
+
+
+def pdf_etag(record: Dict) -> str:
+    """기록 버전이 같으면 같은 값을 돌려주는 강한 ETag."""
+    return f'"{_version_digest(record)}"'
+
+
+def get_cached_pdf(record: Dict) -> Optional[bytes]:
+    return PDF_CACHE.get(_cache_key(record))
+
+
+def store_pdf(record: Dict, pdf_bytes: bytes) -> None:
+    # 같은 기록의 이전 버전은 더 이상 쓰이지 않으므로 먼저 정리합니다.
+    invalidate_record(record["id"])
+    PDF_CACHE.put(_cache_key(record), pdf_bytes)
+
+
+def invalidate_record(record_id: str) -> None:
+    PDF_CACHE.discard_prefix(f"{record_id}.")
@@ -0,0 +1,30 @@
+"""Bounded process pool for PDF rendering so exports don't compete with API handlers for the GIL."""
+
+import os
+from typing import Dict
+
+from .pdf_cache import get_cached_pdf, store_pdf
+from .process_pool import BoundedProcessPool, PoolBusyError
+from .records import record_to_pdf
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(2, os.cpu_count() or 1))))
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", str(PDF_RENDER_WORKERS * 4)))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "30"))
+
+
+class RenderBusyError(PoolBusyError):
+    """대기열이 가득 차서 새 렌더링 작업을 받을 수 없을 때 발생한다."""
+
+
+PDF_RENDERER = BoundedProcessPool(
+    "pdf_render", max(1, PDF_RENDER_WORKERS), PDF_RENDER_MAX_PENDING, PDF_RENDER_TIMEOUT, busy_error=RenderBusyError
+)
+
+
+async def render_record_pdf(record: Dict) -> bytes:
+    """캐시에 있으면 그대로, 없으면 프로세스 풀에서 렌더링한 뒤 캐시에 저장하여 반환한다."""
+    cached = get_cached_pdf(record)
+    if cached is None:
+        cached = await PDF_RENDERER.run(record_to_pdf, record)
+        store_pdf(record, cached)
+    return cached
@@ -0,0 +1,147 @@
+"""Bounded spawn-based process pool for CPU-bound work that must not run on API threads.
+
+PDF 렌더링, 비밀번호 해시, 기사 본문 파싱이 같은 풀 관리 코드를 쓴다. 동시에 대기할 수 있는
+작업 수를 제한하고, 시간이 초과된 작업이 워커를 계속 잡고 있으면 풀을 새로 만든다.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple, Type
+
+
+class PoolBusyError(RuntimeError):
+    """대기열이 가득 차서 새 작업을 받을 수 없을 때 발생한다."""
+
+
+class BoundedProcessPool:
+    """함수를 별도 프로세스에서 실행하고 동시에 대기할 수 있는 작업 수를 제한한다.
+
+    대기 슬롯은 작업이 끝날 때 반환된다. 실행 중에 시간이 초과된 작업은 cancel()로 멈출 수
+    없으므로 워커 프로세스를 종료해 회수한다. 풀이 깨진 작업(워커 비정상 종료, 다른 작업의
+    시간 초과로 인한 회수)은 남은 시간 안에서 새 풀에 한 번만 다시 보내고, 그래도 실패하면
+    busy_error로 거절한다. API 프로세스에서 대신 실행하지 않는다. workers가 0 이하이면
+    프로세스를 띄우지 않고 run은 스레드에서, run_sync는 호출한 스레드에서 바로 실행한다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        max_pending: int,
+        timeout: float,
+        busy_error: Type[PoolBusyError] = PoolBusyError,
+    ) -> None:
+        self.name = name
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self.busy_error = busy_error
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # uvicorn 스레드와 SQLite 연결을 물려받지 않도록 spawn으로 띄웁니다.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_executor(self, executor: Optional[ProcessPoolExecutor] = None, terminate: bool = False) -> None:
+        """executor(기본: 현재 풀)를 닫고, 그것이 현재 풀이면 다음 호출에서 새로 만들게 한다."""
+        with self._lock:
+            if executor is None:
+                executor = self._executor
+            if self._executor is executor:
+                self._executor = None
+        if executor is None:
+            return
+        if terminate:
+            # ProcessPoolExecutor에는 워커를 강제로 멈추는 공개 API가 없어 내부 목록을 씁니다.
+            # 같은 풀에서 돌던 다른 작업은 BrokenProcessPool을 받는다.
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Tuple[ProcessPoolExecutor, Future]:
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise self.busy_error(f"{self.name}_queue_full")
+            self._pending += 1
+        try:
+            future = executor.submit(func, *args)
+        except Exception as exc:
+            with self._lock:
+                self._pending -= 1
+            if isinstance(exc, RuntimeError):
+                # 이미 깨졌거나 다른 요청이 회수(shutdown)한 풀입니다. 호출한 쪽이 새 풀로 다시 보냅니다.
+                self._reset_executor(executor)
+                raise BrokenProcessPool(str(exc)) from exc
+            raise
+        future.add_done_callback(self._release)
+        return executor, future
+
+    def _timed_out(self, executor: ProcessPoolExecutor, future: Future) -> None:
+        future.cancel()
+        if future.running():
+            # 멈춘 작업이 워커와 대기 슬롯을 계속 잡고 있지 않도록 풀을 새로 만듭니다.
+            self._reset_executor(executor, terminate=True)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """func(*args)의 결과. 대기열이 가득 차거나 풀이 거듭 깨지면 busy_error, 시간이 초과되면 asyncio.TimeoutError."""
+        if self.workers <= 0:
+            return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=self.timeout)
+        deadline = time.monotonic() + self.timeout
+        for _attempt in range(2):
+            try:
+                executor, future = self._submit(func, *args)
+            except BrokenProcessPool:
+                continue
+            try:
+                remaining = max(0.0, deadline - time.monotonic())
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=remaining)
+            except asyncio.TimeoutError:
+                self._timed_out(executor, future)
+                raise
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+        raise self.busy_error(f"{self.name}_pool_broken")
+
+    def run_sync(self, func: Callable[..., Any], *args: Any) -> Any:
+        """run의 동기 버전. 작업 스레드에서 호출하며, 시간이 초과되면 TimeoutError."""
+        if self.workers <= 0:
+            return func(*args)
+        deadline = time.monotonic() + self.timeout
+        for _attempt in range(2):
+            try:
+                executor, future = self._submit(func, *args)
+            except BrokenProcessPool:
+                continue
+            try:
+                return future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeoutError:
+                self._timed_out(executor, future)
+                raise
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+        raise self.busy_error(f"{self.name}_pool_broken")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self) -> None:
+        self._reset_executor()
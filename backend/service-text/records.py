@@ -1,18 +1,22 @@
 import json
+import os
 import sqlite3
 import struct
+import time
 import uuid
 import zlib
 from datetime import datetime
-from functools import lru_cache
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / 'data'
 DATA_DIR.mkdir(parents=True, exist_ok=True)
-DB_PATH = DATA_DIR / 'records.db'
+# 벤치마크·테스트에서는 RECORDS_DB_PATH로 별도 DB를 지정할 수 있습니다.
+DB_PATH = Path(os.getenv('RECORDS_DB_PATH') or DATA_DIR / 'records.db')
+DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 FONT_CANDIDATES = [
     '/System/Library/Fonts/Supplemental/AppleGothic.ttf',
@@ -85,6 +89,72 @@ def _connect() -> sqlite3.Connection:
 
 _CONN = _connect()
 
+# 기록이 변경되거나 삭제될 때 호출되는 콜백 목록 (예: PDF 캐시 무효화)
+_RECORD_LISTENERS: List[Callable[[str], None]] = []
+
+
+def add_record_listener(callback: Callable[[str], None]) -> None:
+    """기록이 저장·수정·삭제될 때마다 record_id와 함께 호출될 콜백을 등록한다."""
+    if callback not in _RECORD_LISTENERS:
+        _RECORD_LISTENERS.append(callback)
+
+
+def _notify_record_changed(record_id: str) -> None:
+    for callback in list(_RECORD_LISTENERS):
+        try:
+            callback(record_id)
+        except Exception as exc:  # pragma: no cover - 리스너 오류가 저장을 막지 않도록
+            print(f"[records] listener failed for {record_id}: {exc}")
+
+
+# 사용자 정보가 바뀔 때 호출되는 콜백 목록 (예: 토큰 → 사용자 캐시 무효화)
+_USER_LISTENERS: List[Callable[[str], None]] = []
+
+
+def add_user_listener(callback: Callable[[str], None]) -> None:
+    """사용자 정보(닉네임 등)가 수정될 때마다 user_id와 함께 호출될 콜백을 등록한다."""
+    if callback not in _USER_LISTENERS:
+        _USER_LISTENERS.append(callback)
+
+
+def _notify_user_changed(user_id: str) -> None:
+    for callback in list(_USER_LISTENERS):
+        try:
+            callback(user_id)
+        except Exception as exc:  # pragma: no cover - 리스너 오류가 저장을 막지 않도록
+            print(f"[records] user listener failed for {user_id}: {exc}")
+
+
+# records 함수별 실행 시간(초)을 받는 콜백 목록 (예: /metrics의 SQLite 쿼리 히스토그램)
+_QUERY_LISTENERS: List[Callable[[str, float], None]] = []
+
+
+def add_query_listener(callback: Callable[[str, float], None]) -> None:
+    """DB를 읽고 쓰는 함수가 끝날 때마다 (함수 이름, 소요 초)와 함께 호출될 콜백을 등록한다."""
+    if callback not in _QUERY_LISTENERS:
+        _QUERY_LISTENERS.append(callback)
+
+
+def _timed(func):
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _QUERY_LISTENERS:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            for callback in list(_QUERY_LISTENERS):
+                try:
+                    callback(name, elapsed)
+                except Exception as exc:  # pragma: no cover - 리스너 오류가 조회를 막지 않도록
+                    print(f"[records] query listener failed for {name}: {exc}")
+
+    return wrapper
+
 
 def _row_to_record(row: sqlite3.Row) -> Dict:
     record = {
@@ -116,6 +186,7 @@ def _row_to_user(row: sqlite3.Row) -> Dict:
     }
 
 
+@_timed
 def create_user(username: str, nickname: str, password_hash: str) -> Dict:
     username = username.strip().lower()
     now = _now_iso()
@@ -131,12 +202,22 @@ def create_user(username: str, nickname: str, password_hash: str) -> Dict:
     return get_user_by_id(user_id)
 
 
+@_timed
 def update_user_nickname(user_id: str, nickname: str) -> Dict:
     _CONN.execute('UPDATE users SET nickname = ? WHERE id = ?', (nickname, user_id))
     _CONN.commit()
+    _notify_user_changed(user_id)
     return get_user_by_id(user_id)
 
 
+@_timed
+def update_user_password_hash(user_id: str, password_hash: str) -> None:
+    """로그인 시 해시 비용(rounds)이 바뀐 사용자의 해시를 새 값으로 교체한다."""
+    _CONN.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+    _CONN.commit()
+
+
+@_timed
 def get_user_by_username(username: str) -> Optional[Dict]:
     cur = _CONN.execute('SELECT * FROM users WHERE username = ?', (username.strip().lower(),))
     row = cur.fetchone()
@@ -145,6 +226,7 @@ def get_user_by_username(username: str) -> Optional[Dict]:
     return _row_to_user(row)
 
 
+@_timed
 def get_user_by_id(user_id: str) -> Optional[Dict]:
     cur = _CONN.execute('SELECT * FROM users WHERE id = ?', (user_id,))
     row = cur.fetchone()
@@ -153,6 +235,7 @@ def get_user_by_id(user_id: str) -> Optional[Dict]:
     return _row_to_user(row)
 
 
+@_timed
 def save_record(
     record_type: str,
     payload: Dict,
@@ -208,6 +291,7 @@ def save_record(
         (rec_id, record_type, created, now, day, payload_json, meta_json, evaluation_json, owner_id),
     )
     _CONN.commit()
+    _notify_record_changed(rec_id)
     cur = _CONN.execute('SELECT * FROM records WHERE id = ?', (rec_id,))
     return _row_to_record(cur.fetchone())
 
@@ -309,6 +393,7 @@ def _safe_loads(value: Optional[str]) -> Dict:
     return {}
 
 
+@_timed
 def _build_level_test_entries() -> List[Dict[str, object]]:
     query = (
         'SELECT r.user_id, r.evaluation, r.updated_at, r.created_at, u.nickname '
@@ -387,6 +472,7 @@ def get_user_level_test_rank(user_id: str) -> Optional[Dict[str, object]]:
     return None
 
 
+@_timed
 def _build_learning_entries() -> Dict[str, List[Dict[str, object]]]:
     query = (
         'SELECT r.user_id, r.type, r.payload, r.updated_at, r.created_at, u.nickname '
@@ -474,6 +560,7 @@ def get_user_learning_ranks(user_id: str) -> Dict[str, Optional[Dict[str, object
     }
 
 
+@_timed
 def list_records(date: Optional[str] = None, *, user_id: Optional[str] = None) -> List[Dict]:
     base_query = 'SELECT id, type, created_at, updated_at, date, meta, user_id FROM records'
     clauses = []
@@ -505,6 +592,7 @@ def list_records(date: Optional[str] = None, *, user_id: Optional[str] = None) -
     return results
 
 
+@_timed
 def get_record(record_id: str) -> Optional[Dict]:
     cur = _CONN.execute('SELECT * FROM records WHERE id = ?', (record_id,))
     row = cur.fetchone()
@@ -517,10 +605,14 @@ def list_records_for_user(user_id: str, date: Optional[str] = None) -> List[Dict
     return list_records(date=date, user_id=user_id)
 
 
+@_timed
 def delete_record_for_user(record_id: str, user_id: str) -> bool:
     cur = _CONN.execute('DELETE FROM records WHERE id = ? AND user_id = ?', (record_id, user_id))
     _CONN.commit()
-    return cur.rowcount > 0
+    deleted = cur.rowcount > 0
+    if deleted:
+        _notify_record_changed(record_id)
+    return deleted
 
 
 def _row_to_daily_goal(row: sqlite3.Row) -> Dict[str, object]:
@@ -536,6 +628,7 @@ def _row_to_daily_goal(row: sqlite3.Row) -> Dict[str, object]:
     }
 
 
+@_timed
 def upsert_daily_goal(
     user_id: str,
     goal_date: str,
@@ -573,6 +666,7 @@ def upsert_daily_goal(
     return get_daily_goal(user_id, goal_date)
 
 
+@_timed
 def get_daily_goal(user_id: str, goal_date: str) -> Optional[Dict[str, object]]:
     cur = _CONN.execute(
         'SELECT * FROM daily_goals WHERE user_id = ? AND goal_date = ?',
@@ -584,6 +678,7 @@ def get_daily_goal(user_id: str, goal_date: str) -> Optional[Dict[str, object]]:
     return _row_to_daily_goal(row)
 
 
+@_timed
 def get_daily_activity_counts(user_id: str, goal_date: str) -> Dict[str, int]:
     cur = _CONN.execute(
         "SELECT type, payload FROM records WHERE user_id = ? AND date = ?",
@@ -604,6 +699,7 @@ def get_daily_activity_counts(user_id: str, goal_date: str) -> Dict[str, int]:
     return {'questions': questions, 'discussions': discussions}
 
 
+@_timed
 def get_daily_goal_with_progress(user_id: str, goal_date: str) -> Dict[str, object]:
     goal = get_daily_goal(user_id, goal_date)
     counts = get_daily_activity_counts(user_id, goal_date)
@@ -641,6 +737,7 @@ def get_daily_goal_with_progress(user_id: str, goal_date: str) -> Dict[str, obje
     }
 
 
+@_timed
 def list_goal_achievements(user_id: str, limit: int = 7) -> List[Dict[str, object]]:
     cur = _CONN.execute(
         '''
@@ -1202,6 +1299,10 @@ def _generate_simple_pdf(lines: List[str]) -> bytes:
     return bytes(output)
 
 
+# PDF 레이아웃이나 폰트 처리 방식을 바꾸면 올려서 캐시된 PDF를 무효화합니다.
+PDF_RENDERER_VERSION = '1'
+
+
 def record_to_pdf(record: Dict) -> bytes:
     lines = _record_to_lines(record)
     try:
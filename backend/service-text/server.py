@@ -1,27 +1,30 @@
+import asyncio
 import os
 import traceback
-import json #
-import ast
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, Query, Response, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv, find_dotenv
 import google.generativeai as genai
 
+# 로컬 모듈이 임포트 시점에 읽는 설정(LLM_BACKEND 등)도 .env에서 오도록 먼저 불러옵니다.
+load_dotenv(find_dotenv())
+
 # --- 로컬 모듈 임포트 ---
-from .analyze import analyze
+from .analyze import analysis_latency_stats, analyze
 from .chat import MANAGER as CHAT_MANAGER
-from .extract import extract_from_url
+from .extract import close_http_clients, extract_from_url_async, shutdown_parse_pool
 from .level_test import (
     create_session as create_level_test_session,
     evaluate_responses as evaluate_level_test_responses,
     generate_dynamic_questions,
     get_daily_words,
     get_session_questions as get_level_test_session,
+    active_session_count as active_level_test_sessions,
     questions_to_public_payload,
     select_questions as select_level_test_questions,
 )
@@ -30,18 +33,29 @@ from .auth import (
     create_access_token,
     get_current_user,
     get_current_user_optional,
-    get_password_hash,
+    get_password_hash_async,
+    invalidate_cached_user,
     sanitize_user,
 )
+from .llm import generate_json_async, is_overloaded, llm_stats, uses_fake_backend
+from .metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, HTTPMetricsMiddleware
+from .tracing import TracingMiddleware, record_span
+from .disk_cache import etag_matches
+from .pdf_cache import invalidate_record as invalidate_pdf_cache, pdf_etag
+from .password_hashing import PASSWORD_HASHER, HashBusyError
+from .pdf_render import PDF_RENDERER, RenderBusyError, render_record_pdf
 from .records import (
+    add_query_listener,
+    add_record_listener,
+    add_user_listener,
     create_user,
     delete_record_for_user,
     get_record,
     get_user_by_username,
     list_records,
     list_records_for_user,
-    record_to_pdf,
     records_to_pdf,
+    save_discussion_record,
     save_questions_record,
     get_level_test_rankings,
     get_learning_volume_rankings,
@@ -55,12 +69,29 @@ from .records import (
 )
 
 # --- 환경 변수 및 API 클라이언트 설정 ---
-load_dotenv(find_dotenv())
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise RuntimeError("'.env' 파일에 GOOGLE_API_KEY가 없습니다.")
+if not GOOGLE_API_KEY and not uses_fake_backend():
+    raise RuntimeError("'.env' 파일에 GOOGLE_API_KEY가 없습니다. (오프라인 테스트는 LLM_BACKEND=fake)")
 genai.configure(api_key=GOOGLE_API_KEY)
 
+# 기록이 바뀌거나 삭제되면 캐시된 PDF를 지웁니다.
+add_record_listener(invalidate_pdf_cache)
+# 닉네임이 바뀌면 토큰 → 사용자 캐시에서 그 사용자를 지웁니다.
+add_user_listener(invalidate_cached_user)
+
+# --- /metrics ---
+RECORDS_QUERY_SECONDS = REGISTRY.histogram(
+    "records_query_duration_seconds",
+    "records.py 함수별 SQLite 처리 시간",
+    ("function",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+add_query_listener(lambda name, seconds: RECORDS_QUERY_SECONDS.observe(seconds, function=name))
+add_query_listener(lambda name, seconds: record_span(f"db.{name}", seconds))
+REGISTRY.gauge("chat_sessions_active", "진행 중인 토론 세션 수", callback=lambda: len(CHAT_MANAGER.sessions))
+REGISTRY.gauge("level_test_sessions_active", "만료되지 않은 레벨 테스트 세션 수", callback=active_level_test_sessions)
+REGISTRY.gauge("password_hash_pending", "프로세스 풀에서 대기·실행 중인 비밀번호 해시 작업 수", callback=lambda: PASSWORD_HASHER.pending)
+
 # --- FastAPI 앱 초기화 ---
 app = FastAPI(title="ChatterPals Text API", version="1.0.0")
 
@@ -70,6 +101,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(HTTPMetricsMiddleware)
+app.add_middleware(TracingMiddleware, service="text")
+
+
+@app.on_event("shutdown")
+async def _shutdown_workers() -> None:
+    PDF_RENDERER.shutdown()
+    PASSWORD_HASHER.shutdown()
+    shutdown_parse_pool()
+    await close_http_clients()
+
+
+def _raise_if_llm_overloaded(exc: Exception) -> None:
+    """Gemini 과부하(429, 대기열 시간 초과)는 500 대신 503과 Retry-After로 알린다."""
+    if is_overloaded(exc):
+        raise HTTPException(
+            status_code=503,
+            detail="AI 요청이 몰려 있습니다. 잠시 후 다시 시도해 주세요.",
+            headers={"Retry-After": "5"},
+        ) from exc
 
 
 def _resolve_goal_date(value: Optional[str]) -> str:
@@ -81,10 +132,35 @@ def _resolve_goal_date(value: Optional[str]) -> str:
         return parsed.isoformat()
     return datetime.now(timezone.utc).date().isoformat()
 
+
+async def _pdf_response(record: Dict, if_none_match: Optional[str], disposition: Optional[str] = None) -> Response:
+    etag = pdf_etag(record)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        pdf_bytes = await render_record_pdf(record)
+    except RenderBusyError:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF 생성 요청이 많습니다. 잠시 후 다시 시도해 주세요.",
+            headers={"Retry-After": "5"},
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="PDF 생성 시간이 초과되었습니다.", headers={"Retry-After": "5"})
+    if disposition:
+        headers["Content-Disposition"] = disposition
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
 # --- Pydantic 데이터 모델 정의 ---
 class QuestionsRequest(BaseModel):
     text: Optional[str] = None
     max_questions: int = Field(5, ge=0, le=20)
+    mode: str = Field("llm", pattern="^(llm|fast)$", description="llm: Gemini 분석, fast: 로컬 휴리스틱 엔진")
+
+class AnalyzeUrlRequest(BaseModel):
+    url: str = Field(..., min_length=1, max_length=2048)
+    max_questions: int = Field(5, ge=0, le=20)
 
 class QuestionAnswerItem(BaseModel):
     question: str
@@ -194,25 +270,40 @@ def get_status():
 
 
 @app.post("/auth/signup")
-def post_auth_signup(req: SignupRequest):
+async def post_auth_signup(req: SignupRequest):
     username = req.username.strip().lower()
     nickname = req.nickname.strip()
     if not username or not nickname:
         raise HTTPException(status_code=400, detail="Username and nickname are required")
-    existing = get_user_by_username(username)
+    # 라우트가 async이므로 DB 호출은 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+    existing = await asyncio.to_thread(get_user_by_username, username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
-    password_hash = get_password_hash(req.password)
-    user = create_user(username=username, nickname=nickname, password_hash=password_hash)
+    try:
+        password_hash = await get_password_hash_async(req.password)
+    except (HashBusyError, asyncio.TimeoutError):
+        raise _auth_busy()
+    user = await asyncio.to_thread(create_user, username=username, nickname=nickname, password_hash=password_hash)
     sanitized = sanitize_user(user)
     token = create_access_token({"sub": sanitized["id"]})
     return {"access_token": token, "token_type": "bearer", "user": sanitized}
 
 
+def _auth_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="로그인 요청이 많습니다. 잠시 후 다시 시도해 주세요.",
+        headers={"Retry-After": "2"},
+    )
+
+
 @app.post("/auth/login")
-def post_auth_login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def post_auth_login(form_data: OAuth2PasswordRequestForm = Depends()):
     username = form_data.username.strip().lower()
-    user = authenticate_user(username, form_data.password)
+    try:
+        user = await authenticate_user(username, form_data.password)
+    except (HashBusyError, asyncio.TimeoutError):
+        raise _auth_busy()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
     token = create_access_token({"sub": user["id"]})
@@ -243,14 +334,17 @@ async def get_my_records(
 
 
 @app.get("/me/records/{record_id}.pdf")
-async def get_my_record_pdf(record_id: str, current_user: dict = Depends(get_current_user)):
+async def get_my_record_pdf(
+    record_id: str,
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+):
     record = get_record(record_id)
     if not record or record.get("user_id") != current_user["id"]:
         raise HTTPException(status_code=404, detail="Record not found")
-    pdf_bytes = record_to_pdf(record)
     filename = (record.get("title") or "record").replace(" ", "_")
     disposition = f"attachment; filename=\"{filename}-{record_id[:8]}.pdf\""
-    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": disposition})
+    return await _pdf_response(record, if_none_match, disposition)
 
 
 @app.get("/me/records/{record_id}")
@@ -301,9 +395,45 @@ async def get_my_daily_goal_history(
 @app.post("/questions")
 def post_questions(req: QuestionsRequest):
     try:
-        return analyze((req.text or "").strip(), max_questions=req.max_questions)
+        return analyze((req.text or "").strip(), max_questions=req.max_questions, mode=req.mode)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/analyze_url")
+async def post_analyze_url(req: AnalyzeUrlRequest, current_user: dict = Depends(get_current_user)):
+    """URL 본문을 비동기로 가져와(캐시·조건부 GET) 분석한다. 분석은 동기 LLM 호출이므로 스레드에서 실행한다.
+
+    서버가 임의의 URL을 가져오므로 로그인한 사용자만 쓸 수 있고, 공인 주소가 아닌 곳은 extract에서 거절한다.
+    """
+    try:
+        text, meta = await extract_from_url_async(req.url.strip())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        result = await asyncio.to_thread(analyze, text, max_questions=req.max_questions)
     except Exception as e:
+        _raise_if_llm_overloaded(e)
         raise HTTPException(status_code=500, detail=str(e))
+    return {**result, "meta": meta}
+
+
+@app.get("/questions/stats")
+def get_questions_stats():
+    """분석 티어(llm / llm_failed / local)별 지연 시간 백분위수."""
+    return {"tiers": analysis_latency_stats()}
+
+
+@app.get("/llm/stats")
+def get_llm_stats():
+    """LLM 거버너 상태: 동시 실행 한도, 대기열 길이, 우선순위별 대기 시간, 호출자별 지연 시간."""
+    return llm_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus 텍스트 형식: 라우트별 요청 수·지연, records 쿼리 시간, LLM 호출, 세션 수."""
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 @app.get("/level-test/start", tags=["Level Test"])
@@ -383,7 +513,6 @@ def get_level_test_words(count: int = Query(3, ge=1, le=10)):
 
 # ✅ [신규] 답변 평가 API
 EVALUATION_MODEL = "gemini-2.0-flash-lite-preview"
-JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
 EVALUATION_PROMPT_TEMPLATE = """
     당신은 외국어 학습자의 답변을 평가하는 AI 선생님입니다. 다음은 학생이 질문에 대해 작성한 답변입니다.
     - 질문: "{question}"
@@ -408,74 +537,9 @@ DISCUSSION_EVALUATION_PROMPT_TEMPLATE = """
     JSON 형식으로만 응답하세요. 예시: {{"scores": {{"grammar": 4, "vocabulary": 3, "clarity": 5}}, "feedback": "..."}}
 """
 
-# --- 공통 유틸 ---
-def _extract_json_dict(raw_text: str) -> Dict:
-    """LLM 응답에서 JSON 객체를 파싱한다."""
-    cleaned = (raw_text or "").strip()
-    cleaned = cleaned.replace('```json', '').replace('```', '').strip()
-    if not cleaned:
-        raise ValueError("빈 응답")
-
-    candidates = [cleaned]
-    start = cleaned.find('{')
-    end = cleaned.rfind('}')
-    if start != -1 and end != -1 and end > start:
-        candidates.append(cleaned[start:end + 1])
-
-    for candidate in candidates:
-        try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
-            try:
-                return ast.literal_eval(candidate)
-            except Exception:
-                continue
-    raise ValueError("JSON 파싱 실패")
-
-
-def _extract_json_from_response(response) -> Dict:
-    """google-generativeai Response 객체에서 JSON 딕셔너리를 추출."""
-    candidates: List[str] = []
-    text = getattr(response, "text", None)
-    if text:
-        candidates.append(text)
-
-    for cand in getattr(response, "candidates", []) or []:
-        content = getattr(cand, "content", None)
-        parts = getattr(content, "parts", []) if content else []
-        for part in parts:
-            inline = getattr(part, "inline_data", None)
-            if inline and getattr(inline, "mime_type", "").startswith("application/json"):
-                try:
-                    import base64
-
-                    decoded = base64.b64decode(inline.data).decode("utf-8")
-                    candidates.append(decoded)
-                except Exception:
-                    continue
-            text_part = getattr(part, "text", None)
-            if text_part:
-                candidates.append(text_part)
-            func_call = getattr(part, "function_call", None)
-            if func_call:
-                arguments = getattr(func_call, "arguments", None)
-                if isinstance(arguments, str):
-                    candidates.append(arguments)
-                else:
-                    candidates.append(json.dumps(func_call, ensure_ascii=False))
-
-    for candidate in candidates:
-        try:
-            return _extract_json_dict(candidate)
-        except ValueError:
-            continue
-    raise ValueError("LLM 응답에서 JSON을 찾지 못했습니다.")
-
-
 @app.post("/evaluate/answers", tags=["Answer Evaluation"])
 async def evaluate_answers(req: EvaluationRequest):
     try:
-        model = genai.GenerativeModel(EVALUATION_MODEL)
         evaluations = []
         for item in req.items:
             if not item.answer or not item.answer.strip():
@@ -486,12 +550,12 @@ async def evaluate_answers(req: EvaluationRequest):
                 continue
 
             prompt = EVALUATION_PROMPT_TEMPLATE.format(question=item.question, answer=item.answer)
-            response = await model.generate_content_async(prompt, generation_config=JSON_GENERATION_CONFIG)
-            evaluation_data = _extract_json_from_response(response)
+            evaluation_data = await generate_json_async(EVALUATION_MODEL, prompt, caller="evaluate_answers")
             evaluations.append({"question": item.question, "answer": item.answer, "evaluation": evaluation_data})
         return {"evaluations": evaluations}
     except Exception as e:
         traceback.print_exc()
+        _raise_if_llm_overloaded(e)
         raise HTTPException(status_code=500, detail=f"답변 평가 중 오류가 발생했습니다: {e}")
 
 # ✅ 토론 평가 API
@@ -512,10 +576,9 @@ async def evaluate_discussion(req: DiscussionEvaluationRequest, current_user: di
 
     prompt = DISCUSSION_EVALUATION_PROMPT_TEMPLATE.format(transcript="\n".join(transcript_lines))
     try:
-        model = genai.GenerativeModel(EVALUATION_MODEL)
-        response = await model.generate_content_async(prompt, generation_config=JSON_GENERATION_CONFIG)
-        evaluation_data = _extract_json_from_response(response)
+        evaluation_data = await generate_json_async(EVALUATION_MODEL, prompt, caller="evaluate_discussion")
     except Exception as exc:
+        _raise_if_llm_overloaded(exc)
         raise HTTPException(status_code=500, detail=f"토론 평가에 실패했습니다: {exc}")
 
     payload = record.get("payload") or {}
@@ -583,6 +646,7 @@ def post_chat_start(
         user_id = current_user["id"] if current_user else None
         return CHAT_MANAGER.start(req.text, max_q=req.max_questions, user_id=user_id)
     except Exception as e:
+        _raise_if_llm_overloaded(e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat/reply")
@@ -593,6 +657,7 @@ def post_chat_reply(req: ChatReplyRequest):
             raise HTTPException(status_code=400, detail=result["error"])
         return result
     except Exception as e:
+        _raise_if_llm_overloaded(e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -613,6 +678,14 @@ def get_records_list(date: Optional[str] = Query(None, description="YYYY-MM-DD f
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/records/{record_id}.pdf")
+async def get_record_as_pdf(record_id: str, if_none_match: Optional[str] = Header(None)):
+    record = get_record(record_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return await _pdf_response(record, if_none_match)
+
+
 @app.get("/records/{record_id}")
 def get_record_details(record_id: str):
     record = get_record(record_id)
@@ -638,14 +711,6 @@ async def get_my_rankings(current_user: dict = Depends(get_current_user)):
         "learning": get_user_learning_ranks(current_user["id"]),
     }
 
-@app.get("/records/{record_id}.pdf")
-def get_record_as_pdf(record_id: str):
-    record = get_record(record_id)
-    if not record:
-        raise HTTPException(status_code=404, detail="Record not found")
-    pdf_bytes = record_to_pdf(record)
-    return Response(content=pdf_bytes, media_type="application/pdf")
-
 
 # --- 서버 실행 ---
 def run(host: str = "0.0.0.0", port: int = 8008):
@@ -0,0 +1,82 @@
+"""Coalesce identical in-flight calls so only one upstream request runs per key."""
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def content_key(*parts: Any) -> str:
+    """호출 인자를 정규화한 JSON의 SHA-256 해시를 키로 사용한다."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """스레드용 single-flight. 같은 키로 동시에 들어온 호출은 첫 호출의 결과를 함께 받는다.
+
+    대기자에게는 결과의 깊은 복사본을 돌려주므로 호출자가 결과를 수정해도 서로 영향을 주지 않는다.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as exc:
+                call.error = exc
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+        else:
+            call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result if leader else copy.deepcopy(call.result)
+
+
+class AsyncSingleFlight:
+    """asyncio용 single-flight. 원 호출자가 취소되어도 공유 작업은 계속 진행된다."""
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _t, k=key: self._tasks.pop(k, None))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
@@ -0,0 +1,224 @@
+"""Lightweight per-request tracing emitted as one structured JSON log line per request.
+
+TracingMiddleware가 요청마다 request ID(X-Request-ID 헤더를 그대로 쓰거나 새로 만든다)와
+루트 스팬을 contextvar에 올리고, 그 안에서 열린 span() / record_span()을 모아 요청이 끝나면
+한 줄의 JSON으로 출력한다. DB 호출은 records.add_query_listener, LLM 호출은 llm.py가
+record_span으로 남기므로 느린 요청에서 어느 단계가 시간을 썼는지 바로 보인다.
+
+TRACE_OTEL=1이고 opentelemetry-api가 설치되어 있으면 같은 스팬을 OpenTelemetry로도 보낸다.
+(익스포터 설정은 opentelemetry-sdk / opentelemetry-instrument 쪽에서 한다.)
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import route_template
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # 선택 의존성
+    otel_trace = None
+
+TRACE_LOG = os.getenv("TRACE_LOG", "1").lower() not in ("0", "false", "no")
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))  # 이보다 빠른 정상 요청은 출력하지 않는다
+TRACE_SKIP_PATHS = {p for p in os.getenv("TRACE_SKIP_PATHS", "/metrics").split(",") if p}
+TRACE_OTEL = os.getenv("TRACE_OTEL", "0").lower() in ("1", "true", "yes")
+
+_TRACER = otel_trace.get_tracer("chatterpals") if (TRACE_OTEL and otel_trace is not None) else None
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class _Trace:
+    def __init__(self, request_id: str) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        name: str,
+        span_id: str,
+        parent_id: Optional[str],
+        started: float,
+        ended: float,
+        attrs: Dict[str, Any],
+        error: Optional[str],
+    ) -> None:
+        entry = {
+            "name": name,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "duration_ms": round((ended - started) * 1000, 2),
+            **attrs,
+        }
+        if error:
+            entry["error"] = error
+        # 동기 라우트는 스레드풀에서 돌므로 여러 스레드가 같은 트레이스에 스팬을 남긴다.
+        with self._lock:
+            self.spans.append(entry)
+
+
+# (트레이스, 현재 스팬 id, 현재 스팬 속성)
+_CURRENT: ContextVar[Optional[Tuple[_Trace, str, Dict[str, Any]]]] = ContextVar("tracing_current", default=None)
+
+
+def _new_span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _describe(exc: BaseException) -> str:
+    message = str(exc)
+    return f"{type(exc).__name__}: {message}" if message else type(exc).__name__
+
+
+def _reset(token, previous) -> None:
+    try:
+        _CURRENT.reset(token)
+    except ValueError:
+        # 제너레이터가 다른 컨텍스트에서 재개되면 토큰을 쓸 수 없으므로 이전 값으로 되돌린다.
+        _CURRENT.set(previous)
+
+
+def current_request_id() -> Optional[str]:
+    current = _CURRENT.get()
+    return current[0].request_id if current else None
+
+
+def annotate(**attrs: Any) -> None:
+    """현재 스팬에 속성을 더한다. 트레이스 밖에서는 아무것도 하지 않는다."""
+    current = _CURRENT.get()
+    if current:
+        current[2].update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """현재 요청의 트레이스에 자식 스팬을 남긴다. 돌려주는 dict에 넣은 값은 스팬 속성이 된다."""
+    current = _CURRENT.get()
+    if current is None:
+        yield attrs
+        return
+    trace, parent_id, _parent_attrs = current
+    span_id = _new_span_id()
+    token = _CURRENT.set((trace, span_id, attrs))
+    otel_cm = _TRACER.start_as_current_span(name) if _TRACER else nullcontext()
+    error = None
+    started = time.perf_counter()
+    try:
+        with otel_cm as otel_span:
+            try:
+                yield attrs
+            finally:
+                if otel_span is not None:
+                    otel_span.set_attributes({k: v for k, v in attrs.items() if isinstance(v, (str, bool, int, float))})
+    except BaseException as exc:
+        error = _describe(exc)
+        raise
+    finally:
+        _reset(token, current)
+        trace.add(name, span_id, parent_id, started, time.perf_counter(), attrs, error)
+
+
+def record_span(name: str, seconds: float, error: Optional[str] = None, **attrs: Any) -> None:
+    """이미 끝난 작업(예: records 쿼리 리스너가 알려 준 시간)을 방금 끝난 스팬으로 남긴다."""
+    current = _CURRENT.get()
+    if current is None:
+        return
+    trace, parent_id, _attrs = current
+    ended = time.perf_counter()
+    trace.add(name, _new_span_id(), parent_id, ended - seconds, ended, attrs, error)
+    if _TRACER:
+        end_ns = time.time_ns()
+        otel_span = _TRACER.start_span(name, start_time=end_ns - int(seconds * 1e9))
+        otel_span.set_attributes({k: v for k, v in attrs.items() if isinstance(v, (str, bool, int, float))})
+        otel_span.end(end_time=end_ns)
+
+
+def _emit(trace: _Trace, name: str, attrs: Dict[str, Any], duration: float, error: Optional[str]) -> None:
+    if not TRACE_LOG:
+        return
+    if error is None and attrs.get("status", 200) < 500 and duration * 1000 < TRACE_SLOW_MS:
+        return
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "trace_id": trace.trace_id,
+        "request_id": trace.request_id,
+        "name": name,
+        "duration_ms": round(duration * 1000, 2),
+        **attrs,
+    }
+    if error:
+        record["error"] = error
+    with trace._lock:
+        record["spans"] = sorted(trace.spans, key=lambda entry: entry["start_ms"])
+    print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+
+@contextmanager
+def root_span(name: str, request_id: Optional[str] = None, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """새 트레이스를 시작하고 끝날 때 JSON 한 줄로 출력한다. 돌려주는 dict의 "name"을 바꾸면 출력 이름이 바뀐다."""
+    trace = _Trace(request_id or uuid.uuid4().hex)
+    root_id = _new_span_id()
+    token = _CURRENT.set((trace, root_id, attrs))
+    otel_cm = _TRACER.start_as_current_span(name) if _TRACER else nullcontext()
+    error = None
+    try:
+        with otel_cm:
+            yield attrs
+    except BaseException as exc:
+        error = _describe(exc)
+        raise
+    finally:
+        _reset(token, None)
+        final_name = attrs.pop("name", name)
+        _emit(trace, final_name, attrs, time.perf_counter() - trace.started, error)
+
+
+def _request_id_from(scope: Dict[str, Any]) -> str:
+    for key, value in scope.get("headers") or ():
+        if key == b"x-request-id":
+            candidate = value.decode("latin-1").strip()
+            if _REQUEST_ID_RE.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+class TracingMiddleware:
+    """요청마다 루트 스팬을 열고 응답에 X-Request-ID 헤더를 붙이는 ASGI 미들웨어."""
+
+    def __init__(self, app, service: str) -> None:
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope.get("path") in TRACE_SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        request_id = _request_id_from(scope)
+        method = scope.get("method", "")
+        with root_span(f"{method} {scope.get('path', '')}", request_id, service=self.service) as attrs:
+
+            async def send_with_request_id(message) -> None:
+                if message["type"] == "http.response.start":
+                    attrs["status"] = message["status"]
+                    headers = list(message.get("headers") or [])
+                    headers.append((b"x-request-id", request_id.encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                attrs["name"] = f"{method} {route_template(scope)}"
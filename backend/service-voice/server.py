@@ -1,29 +1,50 @@
 import os
 import io
+import re
+import sys
+import json
+import base64
 import asyncio
-import subprocess
+import importlib
 import shutil
+import time
 from pathlib import Path
 import traceback
+from typing import List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Query, Response, UploadFile, File
+from fastapi import FastAPI, File, Form, Header, HTTPException, Query, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv, find_dotenv
 import google.generativeai as genai
-import requests
+import httpx
 
 # --- 환경 변수 및 API 클라이언트 설정 ---
 load_dotenv(find_dotenv())
+
+# 텍스트 서비스의 공용 LLM 클라이언트(속도 제한·우선순위·AIMD)를 함께 사용합니다.
+# LLM_* 설정을 .env에서 읽도록 load_dotenv 이후에 임포트합니다.
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+llm = importlib.import_module("service-text.llm")
+metrics = importlib.import_module("service-text.metrics")
+tracing = importlib.import_module("service-text.tracing")
+wav = importlib.import_module("service-voice.wav")
+tts_cache = importlib.import_module("service-voice.tts_cache")
+sessions = importlib.import_module("service-voice.sessions")
+
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise RuntimeError("'.env' 파일에 GOOGLE_API_KEY가 없습니다.")
+if not GOOGLE_API_KEY and not llm.uses_fake_backend():
+    raise RuntimeError("'.env' 파일에 GOOGLE_API_KEY가 없습니다. (오프라인 테스트는 LLM_BACKEND=fake)")
 genai.configure(api_key=GOOGLE_API_KEY)
 
 ELEVEN_API_KEY = os.getenv("ELEVEN_API_KEY")
 if not ELEVEN_API_KEY:
-    raise RuntimeError("'.env' 파일에 ELEVEN_API_KEY가 없습니다.")
+    if not llm.uses_fake_backend():
+        raise RuntimeError("'.env' 파일에 ELEVEN_API_KEY가 없습니다.")
+    print("[경고] ELEVEN_API_KEY가 없어 /api/tts는 동작하지 않습니다.")
 
 # --- FastAPI 앱 초기화 ---
 app = FastAPI(title="ChatterPals Voice API", version="1.2.1")
@@ -34,40 +55,541 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.HTTPMetricsMiddleware)
+app.add_middleware(tracing.TracingMiddleware, service="voice")
+
+FFMPEG_SECONDS = metrics.REGISTRY.histogram(
+    "ffmpeg_transcode_duration_seconds", "업로드 오디오를 16kHz WAV로 변환하는 데 걸린 시간", ("outcome",)
+)
+WAV_DECODE_SECONDS = metrics.REGISTRY.histogram(
+    "wav_decode_duration_seconds", "ffmpeg 없이 WAV 업로드를 16kHz 모노로 변환하는 데 걸린 시간"
+)
+AUDIO_DECODES = metrics.REGISTRY.counter(
+    "audio_decode_total", "업로드 형식·변환 경로(wav_fast|ffmpeg)별 오디오 변환 수", ("format", "path")
+)
+TTS_STREAMS = metrics.REGISTRY.counter(
+    "tts_streams_total", "결과(ok|upstream_error|timeout|connect_error|stream_error)별 TTS 스트림 수", ("outcome",)
+)
+TTS_FIRST_BYTE_SECONDS = metrics.REGISTRY.histogram(
+    "tts_first_byte_seconds", "ElevenLabs 요청부터 응답 헤더를 받을 때까지 걸린 시간"
+)
+AUDIO_TRIMS = metrics.REGISTRY.counter(
+    "audio_trim_total", "무음 자르기 결과(trimmed|unchanged|empty)별 클립 수", ("result",)
+)
+AUDIO_SECONDS_INPUT = metrics.REGISTRY.counter(
+    "audio_input_seconds_total", "무음 자르기 전 변환된 오디오 길이의 합"
+)
+AUDIO_SECONDS_SAVED = metrics.REGISTRY.counter(
+    "audio_trimmed_seconds_total", "무음 자르기로 STT에 보내지 않은 오디오 길이의 합"
+)
+VOICE_RESPONSE_SECONDS = metrics.REGISTRY.histogram(
+    "voice_response_duration_seconds",
+    "음성 질문 한 건(변환 → STT → 답변 생성)의 종단 간 시간. 클립 길이 구간·오디오 전달 방식(inline|upload)별",
+    ("clip", "audio_mode"),
+)
+metrics.REGISTRY.gauge(
+    "voice_sessions_active", "만료되지 않은 음성 대화 세션 수", callback=lambda: len(sessions.VOICE_SESSIONS)
+)
+VOICE_TURN_FIRST_AUDIO_SECONDS = metrics.REGISTRY.histogram(
+    "voice_turn_first_audio_seconds", "/api/voice-turn 요청부터 첫 문장 음성을 보낼 때까지 걸린 시간"
+)
+TTS_CACHE_REQUESTS = metrics.REGISTRY.counter(
+    "tts_cache_requests_total", "TTS 오디오 캐시 조회 결과(hit|miss)", ("result",)
+)
+metrics.REGISTRY.gauge(
+    "tts_cache_bytes", "디스크 TTS 캐시에 저장된 오디오 크기", callback=lambda: tts_cache.TTS_CACHE.total_bytes
+)
 
 # --- 모델 및 프롬프트 설정 ---
 MODEL_STT = "gemini-2.0-flash-lite-preview"
 MODEL_CHAT = "gemini-2.0-flash-lite-preview"
 SYSTEM_PROMPT = "너는 친절하고 상냥한 AI 외국어 교육 어시스턴트야. 발음,회화, 문법등을 대화하면서 도와주는 선생님이지."
 
+# --- ffmpeg 설정 ---
+# 바이너리 경로는 시작할 때 한 번만 찾습니다. FFMPEG_BINARY로 직접 지정할 수 있습니다.
+FFMPEG_PATH = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+FFMPEG_MAX_WORKERS = int(os.getenv("FFMPEG_MAX_WORKERS", str(os.cpu_count() or 2)))  # 동시에 실행할 ffmpeg 수
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", "30"))  # 이 시간을 넘긴 ffmpeg는 강제 종료
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+# 변환한 WAV가 이보다 작으면 File API 업로드 없이 요청 본문에 바로 싣습니다(16kHz 모노 기준 약 2분).
+STT_INLINE_MAX_BYTES = int(os.getenv("STT_INLINE_MAX_BYTES", str(4 * 1024 * 1024)))
+# 변환한 오디오의 앞뒤 무음을 잘라 내고 음성이 없으면 STT 없이 거절합니다(wav.trim_silence). 0이면 끕니다.
+VAD_TRIM = os.getenv("VAD_TRIM", "1").lower() not in ("0", "false", "no")
+# WAV 업로드는 ffmpeg 없이 프로세스 안에서 변환합니다(wav.py). 0이면 항상 ffmpeg를 씁니다.
+WAV_FAST_PATH = os.getenv("WAV_FAST_PATH", "1").lower() not in ("0", "false", "no")
+if not FFMPEG_PATH:
+    print("[경고] FFmpeg를 찾을 수 없어 /api/get-ai-response는 동작하지 않습니다.")
+
+_FFMPEG_SLOTS = asyncio.Semaphore(max(1, FFMPEG_MAX_WORKERS))
+
+# --- TTS(ElevenLabs) 설정 ---
+TTS_VOICE_ID = os.getenv("TTS_VOICE_ID", "EXAVITQu4vr4xnSDxMaL")
+TTS_URL = f"https://api.elevenlabs.io/v1/text-to-speech/{TTS_VOICE_ID}/stream"
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_CACHE_CONTROL = "public, max-age=86400"
+# /api/voice-turn: 이보다 짧은 문장은 다음 문장과 합쳐 TTS를 부르고, 한 턴에서 동시에 최대 N개까지 합성한다.
+TTS_SENTENCE_MIN_CHARS = int(os.getenv("TTS_SENTENCE_MIN_CHARS", "12"))
+VOICE_TURN_TTS_CONCURRENCY = int(os.getenv("VOICE_TURN_TTS_CONCURRENCY", "2"))
+TTS_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.75}
+TTS_CHUNK_BYTES = int(os.getenv("TTS_CHUNK_BYTES", str(16 * 1024)))  # 클라이언트로 한 번에 보내는 최대 크기
+TTS_CONNECT_TIMEOUT = float(os.getenv("TTS_CONNECT_TIMEOUT", "5"))
+TTS_READ_TIMEOUT = float(os.getenv("TTS_READ_TIMEOUT", "30"))  # 청크 사이 최대 대기 시간
+TTS_POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("TTS_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("TTS_MAX_KEEPALIVE", "10")),
+)
+
+
+class TranscodeError(RuntimeError):
+    """ffmpeg가 입력을 변환하지 못했을 때 (잘못된 오디오 등)."""
+
+
+class TranscodeTimeout(TranscodeError):
+    """ffmpeg가 FFMPEG_TIMEOUT 안에 끝나지 않아 강제 종료했을 때."""
+
+
+class NoSpeechError(ValueError):
+    """무음 구간을 잘라 내고 나니 음성이 남지 않았을 때. Gemini를 부르기 전에 거절한다."""
+
+
+class TTSUpstreamError(RuntimeError):
+    """ElevenLabs가 오류 상태 코드를 돌려줬을 때."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[str] = None) -> None:
+        super().__init__(f"ElevenLabs {status_code}: {detail}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# --- TTS HTTP 클라이언트 (연결 풀 공유) ---
+# 요청마다 새 HTTPS 연결을 맺지 않도록 이벤트 루프 하나에서 AsyncClient를 같이 쓴다.
+_TTS_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_tts_client() -> httpx.AsyncClient:
+    global _TTS_CLIENT
+    if _TTS_CLIENT is None:
+        _TTS_CLIENT = httpx.AsyncClient(
+            headers={"xi-api-key": ELEVEN_API_KEY or ""},
+            timeout=httpx.Timeout(TTS_READ_TIMEOUT, connect=TTS_CONNECT_TIMEOUT),
+            limits=TTS_POOL_LIMITS,
+        )
+    return _TTS_CLIENT
+
+
+@app.on_event("shutdown")
+async def _close_tts_client() -> None:
+    global _TTS_CLIENT
+    client, _TTS_CLIENT = _TTS_CLIENT, None
+    if client is not None:
+        await client.aclose()
+
+
 # --- 헬퍼 함수 ---
-def transcode_to_wav_pcm16k(audio_bytes: bytes) -> bytes:
-    ffmpeg_path = shutil.which("ffmpeg")
-    if not ffmpeg_path:
-        raise FileNotFoundError("FFmpeg가 설치되어 있지 않습니다. 시스템에 FFmpeg를 설치해주세요.")
+async def _feed_stdin(proc: asyncio.subprocess.Process, upload: UploadFile) -> int:
+    """업로드를 청크 단위로 ffmpeg stdin에 흘려 넣고 넣은 바이트 수를 돌려준다."""
+    fed = 0
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            proc.stdin.write(chunk)
+            await proc.stdin.drain()
+            fed += len(chunk)
+    except (BrokenPipeError, ConnectionResetError):
+        # ffmpeg가 입력을 거부하고 먼저 끝난 경우. 실패 원인은 종료 코드와 stderr로 판단한다.
+        pass
+    finally:
+        proc.stdin.close()
+    return fed
+
+
+async def _run_ffmpeg(upload: UploadFile, attrs: dict) -> bytes:
     command = [
-        ffmpeg_path, '-i', 'pipe:0', '-acodec', 'pcm_s16le',
+        FFMPEG_PATH, '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0', '-acodec', 'pcm_s16le',
         '-ar', '16000', '-ac', '1', '-f', 'wav', 'pipe:1'
     ]
-    process = subprocess.run(command, input=audio_bytes, capture_output=True, check=True)
-    return process.stdout
-
-async def stream_text_to_speech_bytes(text: str):
-    voice_id = "EXAVITQu4vr4xnSDxMaL"
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream"
-    headers = {"xi-api-key": ELEVEN_API_KEY, "Content-Type": "application/json"}
-    payload = {
-        "text": text, "model_id": "eleven_multilingual_v2",
-        "voice_settings": {"stability": 0.5, "similarity_boost": 0.75}
-    }
+    proc = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        # stdout/stderr를 함께 읽어야 파이프 버퍼가 차서 멈추지 않는다.
+        fed, stdout, stderr = await asyncio.wait_for(
+            asyncio.gather(_feed_stdin(proc, upload), proc.stdout.read(), proc.stderr.read()),
+            FFMPEG_TIMEOUT,
+        )
+        returncode = await proc.wait()
+    except BaseException:
+        # 시간 초과·요청 취소 시 멈춘 프로세스를 남기지 않는다. stdin에 남은 버퍼를 비우려고
+        # 기다리면 wait()가 끝나지 않으므로 파이프를 바로 끊는다.
+        if proc.returncode is None:
+            proc.kill()
+        proc.stdin.transport.abort()
+        await proc.wait()
+        raise
+    attrs["input_bytes"] = fed
+    attrs["output_bytes"] = len(stdout)
+    if returncode != 0:
+        detail = stderr.decode("utf-8", errors="replace").strip()[-300:]
+        raise TranscodeError(f"ffmpeg exited with {returncode}: {detail}")
+    return stdout
+
+
+async def _transcode_with_ffmpeg(upload: UploadFile) -> bytes:
+    if not FFMPEG_PATH:
+        raise FileNotFoundError("FFmpeg가 설치되어 있지 않습니다. 시스템에 FFmpeg를 설치해주세요.")
+    outcome = "error"
+    with tracing.span("ffmpeg.transcode") as attrs:
+        waited = time.perf_counter()
+        async with _FFMPEG_SLOTS:
+            started = time.perf_counter()
+            attrs["wait_ms"] = round((started - waited) * 1000, 2)
+            try:
+                wav_bytes = await _run_ffmpeg(upload, attrs)
+                outcome = "ok"
+                return wav_bytes
+            except asyncio.TimeoutError as exc:
+                outcome = "timeout"
+                raise TranscodeTimeout(f"ffmpeg가 {FFMPEG_TIMEOUT:g}초 안에 끝나지 않았습니다.") from exc
+            finally:
+                FFMPEG_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+
+async def transcode_to_wav_pcm16k(upload: UploadFile) -> bytes:
+    """업로드 오디오를 16kHz 모노 PCM WAV로 변환한다.
+
+    WAV는 프로세스 안에서 바로 변환하고, 그 밖의 형식이나 빠른 경로가 처리하지 못한 WAV는
+    ffmpeg(동시 실행 수 FFMPEG_MAX_WORKERS)로 넘긴다.
+    """
+    head = await upload.read(wav.SNIFF_BYTES)
+    audio_format = wav.sniff_format(head)
+    if audio_format == "wav" and WAV_FAST_PATH:
+        data = head + await upload.read()
+        with tracing.span("wav.decode", input_bytes=len(data)) as attrs:
+            started = time.perf_counter()
+            # 리샘플링은 CPU 작업이므로 이벤트 루프 밖에서 실행한다.
+            decoded = await asyncio.to_thread(wav.decode_wav, data)
+            WAV_DECODE_SECONDS.observe(time.perf_counter() - started)
+            attrs["fast_path"] = decoded is not None
+        if decoded is not None:
+            AUDIO_DECODES.inc(format=audio_format, path="wav_fast")
+            return decoded
+    await upload.seek(0)
+    AUDIO_DECODES.inc(format=audio_format, path="ffmpeg")
+    return await _transcode_with_ffmpeg(upload)
+
+
+def tts_payload(text: str) -> dict:
+    return {"text": text, "model_id": TTS_MODEL_ID, "voice_settings": TTS_VOICE_SETTINGS}
+
+
+async def open_tts_stream(payload: dict) -> httpx.Response:
+    """ElevenLabs 스트리밍 요청을 보내고 응답 헤더까지만 받는다.
+
+    본문을 보내기 전에 상태 코드를 확인하므로 업스트림 오류는 TTSUpstreamError(또는 httpx 예외)로
+    올라가고, 호출자는 200 대신 알맞은 오류 응답을 돌려줄 수 있다.
+    """
+    client = _get_tts_client()
+    started = time.perf_counter()
+    try:
+        response = await client.send(client.build_request("POST", TTS_URL, json=payload), stream=True)
+    except httpx.TimeoutException:
+        TTS_STREAMS.inc(outcome="timeout")
+        raise
+    except httpx.HTTPError:
+        TTS_STREAMS.inc(outcome="connect_error")
+        raise
+    elapsed = time.perf_counter() - started
+    TTS_FIRST_BYTE_SECONDS.observe(elapsed)
+    tracing.record_span("tts.connect", elapsed, status=response.status_code)
+    if response.is_error:
+        try:
+            body = (await response.aread()).decode("utf-8", "replace")
+        finally:
+            await response.aclose()
+        TTS_STREAMS.inc(outcome="upstream_error")
+        raise TTSUpstreamError(response.status_code, body[:200], response.headers.get("Retry-After"))
+    return response
+
+
+async def synthesize_tts(text: str) -> bytes:
+    """문장 하나의 음성을 통째로 받는다. 캐시에 있으면 파일을 읽고, 없으면 받아서 캐시에 넣는다."""
+    payload = tts_payload(text)
+    cache_key = tts_cache.tts_cache_key(TTS_VOICE_ID, payload)
+    cached = await asyncio.to_thread(tts_cache.cached_audio, cache_key)
+    if cached is not None:
+        TTS_CACHE_REQUESTS.inc(result="hit")
+        return cached
+    TTS_CACHE_REQUESTS.inc(result="miss")
+    if not ELEVEN_API_KEY:
+        raise RuntimeError("ELEVEN_API_KEY가 설정되어 있지 않습니다.")
+    response = await open_tts_stream(payload)
+    chunks = [chunk async for chunk in relay_tts_stream(response, len(text), tts_cache.CacheTee(cache_key))]
+    return b"".join(chunks)
+
+
+async def relay_tts_stream(response: httpx.Response, chars: int, tee=None):
+    """열린 TTS 응답을 받는 즉시 넘기고, tee가 있으면 끝까지 받은 오디오를 캐시에 저장한다.
+
+    업스트림 청크를 모으지 않고 바로 보내 첫 바이트 지연을 늘리지 않는다. TTS_CHUNK_BYTES는
+    한 번에 보내는 크기의 상한일 뿐이라 그보다 큰 청크만 나눠서 보낸다.
+
+    다음 청크는 앞 청크가 클라이언트 쪽으로 전송된 뒤에야 읽으므로(서버의 send가 쓰기 버퍼가
+    빠질 때까지 기다린다), 느린 클라이언트는 TCP 윈도를 통해 ElevenLabs 쪽 전송 속도까지 늦춘다.
+    중간에 끊기면 빈 청크로 덮지 않고 예외를 다시 올려 연결을 끊으므로 클라이언트도 실패를 안다.
+    """
+    outcome = "stream_error"
     try:
-        response = requests.post(url, headers=headers, json=payload, stream=True)
-        response.raise_for_status()
-        for chunk in response.iter_content(chunk_size=1024):
-            if chunk: yield chunk
+        with tracing.span("tts.fetch", chars=chars) as attrs:
+            attrs["bytes"] = 0
+            async for chunk in response.aiter_bytes():
+                attrs["bytes"] += len(chunk)
+                if tee is not None:
+                    tee.feed(chunk)
+                for start in range(0, len(chunk), TTS_CHUNK_BYTES):
+                    yield chunk[start:start + TTS_CHUNK_BYTES]
+            outcome = "ok"
+            if tee is not None:
+                attrs["cached"] = await asyncio.to_thread(tee.commit)
+    except httpx.HTTPError as e:
+        print(f"TTS 스트림 중단: {type(e).__name__}: {e}")
+        raise
+    finally:
+        TTS_STREAMS.inc(outcome=outcome)
+        await response.aclose()
+
+# 클립 길이 구간(초). 메트릭 라벨이므로 개수를 작게 유지한다.
+_CLIP_BUCKETS = ((5, "0-5s"), (15, "5-15s"), (60, "15-60s"))
+_BACKGROUND_TASKS: set = set()
+
+
+async def trim_silence(wav_bytes: bytes) -> bytes:
+    """앞뒤 무음을 잘라 낸 WAV를 돌려준다. 음성이 없으면 NoSpeechError."""
+    with tracing.span("vad.trim") as attrs:
+        result = await asyncio.to_thread(wav.trim_silence, wav_bytes)
+        attrs.update(input_s=round(result.original_seconds, 2), kept_s=round(result.kept_seconds, 2))
+    AUDIO_SECONDS_INPUT.inc(result.original_seconds)
+    AUDIO_SECONDS_SAVED.inc(result.original_seconds - result.kept_seconds)
+    if result.wav is None:
+        AUDIO_TRIMS.inc(result="empty")
+        raise NoSpeechError("녹음에서 음성을 찾지 못했습니다.")
+    AUDIO_TRIMS.inc(result="trimmed" if result.wav is not wav_bytes else "unchanged")
+    return result.wav
+
+
+def _clip_label(wav_bytes: bytes) -> str:
+    seconds = max(0, len(wav_bytes) - 44) / (wav.TARGET_RATE * 2)
+    for limit, label in _CLIP_BUCKETS:
+        if seconds < limit:
+            return label
+    return "60s+"
+
+
+async def _stt_audio_part(wav_bytes: bytes):
+    """STT 요청에 넣을 오디오와 업로드한 파일(없으면 None)을 돌려준다.
+
+    작은 클립은 inline 데이터로 보내 업로드 왕복을 없애고, STT_INLINE_MAX_BYTES를 넘으면 File API로 올린다.
+    """
+    if len(wav_bytes) <= STT_INLINE_MAX_BYTES:
+        return {"mime_type": "audio/wav", "data": wav_bytes}, None
+    with tracing.span("llm.upload_file", bytes=len(wav_bytes)):
+        uploaded = await asyncio.to_thread(
+            llm.upload_file,
+            path=io.BytesIO(wav_bytes),
+            display_name="user_audio.wav",
+            mime_type="audio/wav",
+        )
+    return uploaded, uploaded
+
+
+async def _delete_uploaded(name: str) -> None:
+    try:
+        await asyncio.to_thread(llm.delete_file, name)
     except Exception as e:
-        print(f"TTS 오류: {e}")
-        yield b''
+        print(f"업로드 파일 삭제 실패({name}): {e}")
+
+
+def _delete_uploaded_later(uploaded) -> None:
+    """응답을 늦추지 않도록 업로드한 파일은 백그라운드에서 지운다."""
+    task = asyncio.create_task(_delete_uploaded(uploaded.name))
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+async def transcribe_upload(audio: UploadFile) -> Tuple[str, bytes, str]:
+    """업로드 오디오를 변환해 STT까지 마치고 (transcript, 변환한 WAV, 오디오 전달 방식)을 돌려준다."""
+    wav_audio_bytes = await transcode_to_wav_pcm16k(audio)
+    if VAD_TRIM:
+        wav_audio_bytes = await trim_silence(wav_audio_bytes)
+
+    audio_part, uploaded_file = await _stt_audio_part(wav_audio_bytes)
+    audio_mode = "inline" if uploaded_file is None else "upload"
+    tracing.annotate(audio_mode=audio_mode)
+    # AI가 더 잘 인식하도록 프롬프트를 직접적으로 수정
+    stt_prompt = "이 오디오 파일의 내용을 텍스트로 받아적어 주세요."
+    try:
+        stt_response = await llm.generate_async(
+            MODEL_STT, [stt_prompt, audio_part], caller="voice_stt", priority=llm.PRIORITY_INTERACTIVE
+        )
+    finally:
+        if uploaded_file is not None:
+            _delete_uploaded_later(uploaded_file)
+
+    transcript = llm.response_text(stt_response).strip()
+    tracing.annotate(transcript_chars=len(transcript))
+
+    # '인식 실패' 문자열 대신, 결과가 비어 있는지 여부로 판단
+    if not transcript:
+        raise ValueError("STT recognized empty text.")
+    return transcript, wav_audio_bytes, audio_mode
+
+
+def _voice_http_error(e: Exception) -> HTTPException:
+    if isinstance(e, TranscodeTimeout):
+        return HTTPException(
+            status_code=503,
+            detail="오디오 변환이 지연되고 있습니다. 잠시 후 다시 시도해 주세요.",
+            headers={"Retry-After": "5"},
+        )
+    if isinstance(e, TranscodeError):
+        return HTTPException(status_code=400, detail="오디오 파일을 변환할 수 없습니다.")
+    if isinstance(e, NoSpeechError):
+        return HTTPException(status_code=422, detail="녹음에서 음성을 찾지 못했습니다. 다시 말씀해 주세요.")
+    if llm.is_overloaded(e):
+        return HTTPException(
+            status_code=503,
+            detail="AI 요청이 몰려 있습니다. 잠시 후 다시 시도해 주세요.",
+            headers={"Retry-After": "5"},
+        )
+    return HTTPException(status_code=500, detail=f"음성 처리 중 서버 오류 발생: {str(e)}")
+
+
+# --- 음성 턴 파이프라인 (STT → 답변 스트리밍 → 문장별 TTS) ---
+_SENTENCE_END_RE = re.compile(r"[.!?。！？…]+[\"'”’)\]]*\s+|\n+")
+
+
+class SentenceSplitter:
+    """스트리밍으로 받는 텍스트 조각을 모아 끝난 문장 단위로 돌려준다. min_chars보다 짧은 문장은 다음 문장과 합친다."""
+
+    def __init__(self, min_chars: int) -> None:
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END_RE.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def voice_turn_events(session, transcript: str, started: float):
+    """답변 생성과 TTS를 겹쳐 실행하면서 NDJSON 이벤트를 만든다.
+
+    답변 조각은 오는 대로 내보내고, 문장이 끝날 때마다 TTS를 바로 시작한다(동시에 VOICE_TURN_TTS_CONCURRENCY개).
+    오디오는 문장 순서대로 내보내므로 첫 문장의 음성은 뒤 문장이 생성되는 동안 재생을 시작할 수 있다.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    sentences: asyncio.Queue = asyncio.Queue()
+    tts_slots = asyncio.Semaphore(max(1, VOICE_TURN_TTS_CONCURRENCY))
+    tts_tasks: List[asyncio.Task] = []
+    first_audio: List[float] = []
+
+    async def synthesize(text: str) -> bytes:
+        async with tts_slots:
+            return await synthesize_tts(text)
+
+    def schedule(text: str) -> None:
+        task = asyncio.create_task(synthesize(text))
+        tts_tasks.append(task)
+        sentences.put_nowait((len(tts_tasks) - 1, text, task))
+
+    async def generate_reply() -> str:
+        splitter = SentenceSplitter(TTS_SENTENCE_MIN_CHARS)
+        parts: List[str] = []
+        try:
+            async for delta in llm.stream_async(
+                MODEL_CHAT,
+                session.contents(transcript),
+                caller="voice_chat",
+                priority=llm.PRIORITY_INTERACTIVE,
+                system_instruction=SYSTEM_PROMPT,
+            ):
+                parts.append(delta)
+                events.put_nowait({"type": "text", "delta": delta})
+                for sentence in splitter.feed(delta):
+                    schedule(sentence)
+            for sentence in splitter.flush():
+                schedule(sentence)
+            return "".join(parts).strip()
+        finally:
+            sentences.put_nowait(None)
+
+    async def deliver_audio() -> None:
+        while (item := await sentences.get()) is not None:
+            index, text, task = item
+            try:
+                audio = await task
+            except Exception as e:
+                print(f"TTS 오류(문장 {index}): {type(e).__name__}: {e}")
+                events.put_nowait({"type": "audio_error", "index": index, "text": text})
+                continue
+            if not first_audio:
+                first_audio.append(time.perf_counter() - started)
+                VOICE_TURN_FIRST_AUDIO_SECONDS.observe(first_audio[0])
+            events.put_nowait({
+                "type": "audio", "index": index, "text": text,
+                "mime_type": "audio/mpeg", "data": base64.b64encode(audio).decode("ascii"),
+            })
+
+    async def finish(reply: asyncio.Task, audio: asyncio.Task) -> None:
+        await asyncio.gather(reply, audio, return_exceptions=True)
+        if reply.exception() is not None:
+            e = reply.exception()
+            tracing.annotate(error=f"{type(e).__name__}: {e}")
+            events.put_nowait({"type": "error", "detail": _voice_http_error(e).detail})
+        else:
+            response_text = reply.result()
+            sessions.VOICE_SESSIONS.record_turn(session, transcript, response_text)
+            tracing.annotate(response_chars=len(response_text), sentences=len(tts_tasks))
+            events.put_nowait({
+                "type": "done",
+                "response_text": response_text,
+                "first_audio_ms": round(first_audio[0] * 1000, 1) if first_audio else None,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+        events.put_nowait(None)
+
+    yield _ndjson({"type": "transcript", "text": transcript, "session_id": session.session_id})
+    reply = asyncio.create_task(generate_reply())
+    audio = asyncio.create_task(deliver_audio())
+    finisher = asyncio.create_task(finish(reply, audio))
+    try:
+        while (event := await events.get()) is not None:
+            yield _ndjson(event)
+    finally:
+        # 클라이언트가 끊으면 남은 생성·합성을 모두 취소한다.
+        for task in (finisher, reply, audio, *tts_tasks):
+            task.cancel()
+
 
 # --- API 엔드포인트 ---
 @app.get("/")
@@ -75,49 +597,149 @@ def get_status():
     return {"status": "Voice server is running"}
 
 @app.post("/api/get-ai-response")
-async def get_ai_response(audio: UploadFile = File(...)):
+async def get_ai_response(audio: UploadFile = File(...), session_id: Optional[str] = Form(None)):
+    started = time.perf_counter()
     try:
-        print("[1/3] 오디오 파일 수신 및 변환 중...")
-        input_audio_bytes = await audio.read()
-        wav_audio_bytes = transcode_to_wav_pcm16k(input_audio_bytes)
-
-        print("[2/3] Gemini File API에 오디오 업로드 및 STT 실행 중...")
-        uploaded_file = genai.upload_file(
-            path=io.BytesIO(wav_audio_bytes),
-            display_name="user_audio.wav",
-            mime_type="audio/wav"
+        transcript, wav_audio_bytes, audio_mode = await transcribe_upload(audio)
+        session = sessions.VOICE_SESSIONS.get_or_create(session_id)
+        llm_response = await llm.generate_async(
+            MODEL_CHAT,
+            session.contents(transcript),
+            caller="voice_chat",
+            priority=llm.PRIORITY_INTERACTIVE,
+            system_instruction=SYSTEM_PROMPT,
+        )
+        response_text = llm.response_text(llm_response).strip()
+        sessions.VOICE_SESSIONS.record_turn(session, transcript, response_text)
+        tracing.annotate(response_chars=len(response_text), session_turns=session.turn_count)
+        VOICE_RESPONSE_SECONDS.observe(
+            time.perf_counter() - started, clip=_clip_label(wav_audio_bytes), audio_mode=audio_mode
         )
-        stt_model = genai.GenerativeModel(MODEL_STT)
 
-        # AI가 더 잘 인식하도록 프롬프트를 직접적으로 수정
-        stt_prompt = "이 오디오 파일의 내용을 텍스트로 받아적어 주세요."
-        stt_response = await stt_model.generate_content_async([stt_prompt, uploaded_file])
-        
-        # 더 안정적인 파싱 방법 사용
-        transcript = "".join(part.text for part in stt_response.candidates[0].content.parts).strip()
-        print(f"[2/3] STT 결과: '{transcript}'")
+        return JSONResponse(content={
+            "transcript": transcript,
+            "response_text": response_text,
+            "session_id": session.session_id,
+        })
 
-        # '인식 실패' 문자열 대신, 결과가 비어 있는지 여부로 판단
-        if not transcript:
-            print("[오류] STT 결과가 비어 있습니다. 음성 인식이 실패한 것으로 간주합니다.")
-            raise ValueError("STT recognized empty text.")
+    except NoSpeechError as e:
+        # 무음 녹음은 예상된 클라이언트 오류(422)이므로 스택 트레이스를 남기지 않는다.
+        tracing.annotate(no_speech=True)
+        raise _voice_http_error(e)
+    except Exception as e:
+        traceback.print_exc()
+        tracing.annotate(error=f"{type(e).__name__}: {e}")
+        raise _voice_http_error(e)
 
-        print("[3/3] Gemini 채팅 응답 생성 중...")
-        chat_model = genai.GenerativeModel(MODEL_CHAT, system_instruction=SYSTEM_PROMPT)
-        llm_response = await chat_model.generate_content_async(transcript)
-        response_text = "".join(part.text for part in llm_response.candidates[0].content.parts).strip()
-        print(f"[3/3] Gemini 응답: {response_text}")
 
-        return JSONResponse(content={"transcript": transcript, "response_text": response_text})
+@app.post("/api/voice-turn")
+async def voice_turn(audio: UploadFile = File(...), session_id: Optional[str] = Form(None)):
+    """음성 한 턴을 한 번의 요청으로 처리한다: STT → 답변 스트리밍 → 문장별 TTS.
 
+    STT까지는 응답 전에 끝내므로 변환·인식 오류는 get-ai-response와 같은 상태 코드로 돌려준다.
+    이후에는 NDJSON 이벤트를 흘려보낸다:
+      {"type": "transcript", "text", "session_id"}  → {"type": "text", "delta"}…
+      {"type": "audio", "index", "text", "mime_type", "data"(base64)} 문장 순서대로 (실패 시 "audio_error")
+      {"type": "done", "response_text", "first_audio_ms", "total_ms"} 또는 {"type": "error", "detail"}
+    """
+    started = time.perf_counter()
+    try:
+        transcript, _wav_audio_bytes, _audio_mode = await transcribe_upload(audio)
+    except NoSpeechError as e:
+        tracing.annotate(no_speech=True)
+        raise _voice_http_error(e)
     except Exception as e:
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"음성 처리 중 서버 오류 발생: {str(e)}")
+        tracing.annotate(error=f"{type(e).__name__}: {e}")
+        raise _voice_http_error(e)
+    return StreamingResponse(
+        voice_turn_events(sessions.VOICE_SESSIONS.get_or_create(session_id), transcript, started),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/api/voice-sessions/{session_id}")
+def end_voice_session(session_id: str):
+    if not sessions.VOICE_SESSIONS.discard(session_id):
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    return {"ok": True}
+
+
+@app.get("/api/llm/stats")
+def get_llm_stats():
+    return llm.llm_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
 
 
 @app.get("/api/tts")
-async def tts_streaming_endpoint(text: str = Query(..., min_length=1)):
-    return StreamingResponse(stream_text_to_speech_bytes(text), media_type="audio/mpeg")
+async def tts_streaming_endpoint(
+    text: str = Query(..., min_length=1),
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+):
+    payload = tts_payload(text)
+    cache_key = tts_cache.tts_cache_key(TTS_VOICE_ID, payload)
+    cache_headers = {"ETag": tts_cache.audio_etag(cache_key), "Cache-Control": TTS_CACHE_CONTROL}
+    # 경로 대신 바이트를 읽어 둔다. 경로만 넘기면 응답을 보내기 전에 다른 요청의 저장이
+    # 이 파일을 LRU로 지울 수 있다. 항목은 TTS_CACHE_MAX_ITEM_BYTES 이하라 메모리에 둬도 된다.
+    cached = await asyncio.to_thread(tts_cache.cached_audio, cache_key)
+    if cached is not None:
+        TTS_CACHE_REQUESTS.inc(result="hit")
+        tracing.annotate(tts_cache="hit")
+        if tts_cache.etag_matches(if_none_match, cache_headers["ETag"]):
+            return Response(status_code=304, headers=cache_headers)
+        headers = {**cache_headers, "X-TTS-Cache": "hit", "Accept-Ranges": "bytes"}
+        # If-Range가 현재 ETag와 다르면 Range를 무시하고 전체를 보낸다.
+        span = None
+        if if_range is None or if_range.strip() == cache_headers["ETag"]:
+            try:
+                span = tts_cache.byte_range(range_header, len(cached))
+            except tts_cache.RangeNotSatisfiable:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(cached)}"})
+        if span is not None:
+            start, end = span
+            return Response(
+                cached[start:end + 1],
+                status_code=206,
+                media_type="audio/mpeg",
+                headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(cached)}"},
+            )
+        return Response(cached, media_type="audio/mpeg", headers=headers)
+    TTS_CACHE_REQUESTS.inc(result="miss")
+    tracing.annotate(tts_cache="miss")
+    if not ELEVEN_API_KEY:
+        raise HTTPException(status_code=503, detail="TTS가 설정되어 있지 않습니다.")
+    try:
+        response = await open_tts_stream(payload)
+    except TTSUpstreamError as e:
+        print(f"TTS 오류: {e}")
+        tracing.annotate(error=str(e))
+        if e.status_code == 429:
+            raise HTTPException(
+                status_code=503,
+                detail="TTS 요청이 몰려 있습니다. 잠시 후 다시 시도해 주세요.",
+                headers={"Retry-After": e.retry_after or "5"},
+            )
+        if e.status_code in (400, 422):
+            raise HTTPException(status_code=400, detail="음성으로 변환할 수 없는 텍스트입니다.")
+        raise HTTPException(status_code=502, detail=f"TTS 서버 오류 ({e.status_code})")
+    except httpx.TimeoutException as e:
+        tracing.annotate(error=f"{type(e).__name__}: {e}")
+        raise HTTPException(status_code=504, detail="TTS 서버 응답이 지연되고 있습니다.")
+    except httpx.HTTPError as e:
+        tracing.annotate(error=f"{type(e).__name__}: {e}")
+        raise HTTPException(status_code=502, detail="TTS 서버에 연결할 수 없습니다.")
+    return StreamingResponse(
+        relay_tts_stream(response, len(text), tts_cache.CacheTee(cache_key)),
+        media_type="audio/mpeg",
+        headers={**cache_headers, "X-TTS-Cache": "miss"},
+    )
 
 # --- 서버 실행 ---
 def run(host: str = "0.0.0.0", port: int = 8000):
@@ -0,0 +1,106 @@
+"""Bounded, TTL-evicted store of voice tutor conversations with a compact rolling context.
+
+음성 대화가 클립마다 상태 없이 끊기지 않도록 세션별로 최근 대화를 기억한다. 최근
+VOICE_CONTEXT_TURNS개 턴은 그대로 두고, 그보다 오래된 턴은 사용자 발화의 앞부분만 짧게
+요약 목록(digest)으로 남겨 프롬프트가 대화 길이에 비례해 커지지 않게 한다.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+VOICE_SESSION_TTL = float(os.getenv("VOICE_SESSION_TTL", "1800"))  # 마지막 사용 후 이 시간(초)이 지나면 만료
+VOICE_SESSION_MAX = int(os.getenv("VOICE_SESSION_MAX", "1000"))  # 넘으면 가장 오래 쓰지 않은 세션부터 제거
+VOICE_CONTEXT_TURNS = int(os.getenv("VOICE_CONTEXT_TURNS", "6"))  # 그대로 보내는 최근 턴 수
+VOICE_CONTEXT_MAX_CHARS = int(os.getenv("VOICE_CONTEXT_MAX_CHARS", "4000"))  # 최근 턴 전체 글자 수 상한
+VOICE_DIGEST_ITEMS = 8
+VOICE_DIGEST_CHARS = 80
+
+
+@dataclass
+class VoiceSession:
+    session_id: str
+    last_used: float = field(default_factory=time.monotonic)
+    turns: Deque[Tuple[str, str]] = field(default_factory=deque)  # (사용자 발화, 튜터 답변)
+    digest: Deque[str] = field(default_factory=lambda: deque(maxlen=VOICE_DIGEST_ITEMS))
+    turn_count: int = 0
+
+    def _chars(self) -> int:
+        return sum(len(user) + len(reply) for user, reply in self.turns)
+
+    def add_turn(self, user_text: str, reply_text: str) -> None:
+        self.turns.append((user_text, reply_text))
+        self.turn_count += 1
+        # 마지막 턴은 글자 수 상한을 넘더라도 남긴다.
+        while len(self.turns) > 1 and (len(self.turns) > VOICE_CONTEXT_TURNS or self._chars() > VOICE_CONTEXT_MAX_CHARS):
+            old_user, _old_reply = self.turns.popleft()
+            self.digest.append(old_user[:VOICE_DIGEST_CHARS])
+
+    def contents(self, transcript: str) -> List[Dict[str, object]]:
+        """이전 대화와 이번 발화를 Gemini 멀티턴 contents 형식으로 만든다."""
+        history: List[Dict[str, object]] = []
+        if self.digest:
+            earlier = "\n".join(f"- {line}" for line in self.digest)
+            history.append({"role": "user", "parts": [f"(앞선 대화에서 학습자가 한 말)\n{earlier}"]})
+            history.append({"role": "model", "parts": ["네, 기억하고 이어서 도와드릴게요."]})
+        for user_text, reply_text in self.turns:
+            history.append({"role": "user", "parts": [user_text]})
+            history.append({"role": "model", "parts": [reply_text]})
+        history.append({"role": "user", "parts": [transcript]})
+        return history
+
+
+class VoiceSessionStore:
+    """세션 id → VoiceSession. 동기 라우트와 이벤트 루프 양쪽에서 쓰므로 잠금으로 보호한다."""
+
+    def __init__(self, ttl: float = VOICE_SESSION_TTL, max_sessions: int = VOICE_SESSION_MAX) -> None:
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[str, VoiceSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_locked(self, now: float) -> None:
+        # 최근 사용 순서로 정렬되어 있으므로 앞에서부터 만료된 세션만 확인하면 된다.
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used < self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def get_or_create(self, session_id: Optional[str]) -> VoiceSession:
+        """살아 있는 세션이면 그대로, 없거나 만료되었으면 새 id로 만든다(클라이언트가 id를 정하지 않는다)."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_locked(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = VoiceSession(uuid.uuid4().hex)
+                self._sessions[session.session_id] = session
+                self._evict_locked(now)
+            session.last_used = now
+            self._sessions.move_to_end(session.session_id)
+            return session
+
+    def record_turn(self, session: VoiceSession, user_text: str, reply_text: str) -> None:
+        with self._lock:
+            session.add_turn(user_text, reply_text)
+            session.last_used = time.monotonic()
+            # _evict_locked는 최근 사용 순서를 전제로 하므로 순서도 함께 갱신한다(이미 제거된 세션이면 넣지 않는다).
+            if self._sessions.get(session.session_id) is session:
+                self._sessions.move_to_end(session.session_id)
+
+    def discard(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            return len(self._sessions)
+
+
+VOICE_SESSIONS = VoiceSessionStore()
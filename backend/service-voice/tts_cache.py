@@ -0,0 +1,98 @@
+"""Content-addressed disk cache for synthesized TTS audio, keyed by text, voice and model settings.
+
+같은 문장(세션 종료 인사, 자주 쓰는 튜터 문구, 다시 재생한 답변)을 매번 ElevenLabs에 다시
+합성시키지 않도록 MP3를 로컬 디스크에 보관한다. 저장과 LRU 제거는 텍스트 서버의 PDF 캐시와
+같은 DiskLRUCache가 맡는다. 서버가 sys.path에 backend/를 넣은 뒤 임포트해야 한다.
+"""
+
+import importlib
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+_disk_cache = importlib.import_module("service-text.disk_cache")
+DiskLRUCache = _disk_cache.DiskLRUCache
+etag_matches = _disk_cache.etag_matches
+content_key = importlib.import_module("service-text.singleflight").content_key
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TTS_CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", str(BACKEND_DIR / "data" / "tts_cache")))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# 이보다 긴 스트림은 전달만 하고 저장하지 않는다(메모리에 모았다가 한 번에 기록하므로).
+TTS_CACHE_MAX_ITEM_BYTES = int(os.getenv("TTS_CACHE_MAX_ITEM_BYTES", str(4 * 1024 * 1024)))
+
+TTS_CACHE = DiskLRUCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, suffix=".mp3")
+
+
+def tts_cache_key(voice_id: str, payload: Dict[str, Any]) -> str:
+    """텍스트·모델·음성 설정이 담긴 요청 본문과 voice_id가 같으면 같은 키가 된다."""
+    return content_key("tts", voice_id, payload)
+
+
+def cached_audio(key: str) -> Optional[bytes]:
+    """캐시된 오디오 바이트. 디스크를 읽으므로 이벤트 루프에서는 스레드로 호출한다."""
+    return TTS_CACHE.get(key)
+
+
+def audio_etag(key: str) -> str:
+    """키가 내용에서 나오므로 같은 키의 오디오는 항상 같다. 강한 ETag로 그대로 쓴다."""
+    return f'"{key[:32]}"'
+
+
+class RangeNotSatisfiable(ValueError):
+    """요청한 구간이 오디오 길이를 벗어났을 때(416)."""
+
+
+def byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """`bytes=a-b`, `bytes=a-`, `bytes=-n` 형식의 단일 구간을 (start, end)로 돌려준다(end 포함).
+
+    헤더가 없거나 해석할 수 없거나 여러 구간이면 None을 돌려주며, 이때는 전체를 200으로 보낸다.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(range_header)
+            start, end = max(0, size - suffix), size - 1
+    except RangeNotSatisfiable:
+        raise
+    except ValueError:
+        return None
+    if start < 0 or (last and end < start):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    return start, min(end, size - 1)
+
+
+class CacheTee:
+    """스트림을 전달하면서 청크를 모아 두었다가, 끝까지 받았을 때만 캐시에 기록한다."""
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._buffer: Optional[bytearray] = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        if self._buffer is None:
+            return
+        self._buffer += chunk
+        if len(self._buffer) > TTS_CACHE_MAX_ITEM_BYTES:
+            self._buffer = None
+
+    def commit(self) -> bool:
+        """모은 오디오를 저장하고 저장했는지 돌려준다. 디스크 쓰기이므로 스레드에서 호출한다."""
+        data, self._buffer = self._buffer, None
+        if not data:
+            return False
+        return TTS_CACHE.put(self.key, bytes(data)) is not None
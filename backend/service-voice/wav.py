@@ -0,0 +1,188 @@
+"""In-process WAV decoding so uploads that are already PCM/float WAV skip the ffmpeg subprocess.
+
+sniff_format로 업로드 앞부분만 보고 형식을 판별하고, WAV면 decode_wav가 헤더를 직접 읽어
+16kHz 모노 16비트 PCM WAV로 바꾼다. 이미 그 형식이면 샘플을 그대로 쓰고, 아니면 NumPy로
+채널을 평균해 모노로 만든 뒤 FFT로 리샘플링한다. NumPy가 없거나 지원하지 않는 WAV(ADPCM 등)면
+None을 돌려주며, 그때는 호출자가 ffmpeg로 넘어간다.
+
+trim_silence는 변환을 마친 16kHz 모노 PCM16 WAV에서 프레임 에너지로 앞뒤 무음을 잘라 낸다.
+"""
+
+import os
+import struct
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 선택 의존성: 없으면 16kHz 모노 PCM16만 빠른 경로로 처리한다
+    np = None
+
+TARGET_RATE = 16000
+SNIFF_BYTES = 12
+
+# --- 무음 구간 자르기(VAD) 설정 ---
+VAD_FRAME_MS = 20
+VAD_MIN_DBFS = float(os.getenv("VAD_MIN_DBFS", "-45"))  # 이보다 조용한 프레임은 항상 무음
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))  # 잡음 바닥보다 이만큼 커야 음성
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))  # 음성 앞뒤로 남겨 두는 여유
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "200"))  # 음성 프레임이 이보다 적으면 빈 클립
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def sniff_format(head: bytes) -> str:
+    """파일 앞 12바이트로 컨테이너 형식을 추정한다. 메트릭 라벨로 쓰므로 값의 종류를 작게 유지한다."""
+    if head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    return "unknown"
+
+
+def _parse_chunks(data: bytes) -> Optional[Tuple[int, int, int, int, memoryview]]:
+    """(포맷 코드, 채널 수, 샘플레이트, 샘플 비트 수, 샘플 데이터)를 돌려준다. 읽을 수 없으면 None."""
+    if len(data) < 12 or data[8:12] != b"WAVE":
+        return None
+    view = memoryview(data)
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = bytes(view[pos:pos + 4])
+        size = struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt " and size >= 16:
+            audio_format, channels, rate, _byte_rate, _align, bits = struct.unpack_from("<HHIIHH", data, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and size >= 40:
+                # SubFormat GUID의 앞 2바이트가 실제 포맷 코드다.
+                audio_format = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (audio_format, channels, rate, bits)
+        elif chunk_id == b"data" and fmt is not None:
+            # 스트리밍으로 만든 WAV는 크기가 0이나 0xFFFFFFFF로 남아 있으므로 파일 끝까지 읽는다.
+            end = len(data) if size in (0, 0xFFFFFFFF) else min(len(data), body + size)
+            return fmt + (view[body:end],)
+        pos = body + size + (size & 1)
+    return None
+
+
+def _to_float_mono(samples: memoryview, audio_format: int, channels: int, bits: int):
+    width = bits // 8
+    usable = len(samples) - len(samples) % (width * channels)
+    raw = samples[:usable]
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        values, scale = np.frombuffer(raw, dtype="<f4" if bits == 32 else "<f8"), 1.0
+    elif audio_format == WAVE_FORMAT_PCM and bits == 8:
+        values, scale = np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128, 1 / 128
+    elif audio_format == WAVE_FORMAT_PCM and bits == 16:
+        values, scale = np.frombuffer(raw, dtype="<i2"), 1 / 32768
+    elif audio_format == WAVE_FORMAT_PCM and bits == 24:
+        triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+        values, scale = np.where(values & 0x800000, values - 0x1000000, values), 1 / 8388608
+    elif audio_format == WAVE_FORMAT_PCM and bits == 32:
+        values, scale = np.frombuffer(raw, dtype="<i4"), 1 / 2147483648
+    else:
+        return None
+    frames = values.astype(np.float32)
+    if channels == 1:
+        return frames * np.float32(scale)
+    # 채널 평균과 정규화를 한 번의 행렬-벡터 곱으로 처리한다(axis 평균보다 훨씬 빠르다).
+    weights = np.full(channels, scale / channels, dtype=np.float32)
+    return frames.reshape(-1, channels) @ weights
+
+
+def _resample(pcm, rate: int):
+    """FFT 스펙트럼을 자르거나 0으로 채워 TARGET_RATE로 바꾼다. 나이퀴스트 위 성분은 잘려 나가므로 에일리어싱이 없다."""
+    if rate == TARGET_RATE or len(pcm) == 0:
+        return pcm
+    n_out = max(1, int(round(len(pcm) * TARGET_RATE / rate)))
+    spectrum = np.fft.rfft(pcm)
+    bins = n_out // 2 + 1
+    if len(spectrum) >= bins:
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.concatenate([spectrum, np.zeros(bins - len(spectrum), dtype=spectrum.dtype)])
+    return (np.fft.irfft(spectrum, n_out) * (n_out / len(pcm))).astype(np.float32)
+
+
+def _wav_bytes(pcm16: bytes) -> bytes:
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(pcm16), b"WAVE",
+        b"fmt ", 16, WAVE_FORMAT_PCM, 1, TARGET_RATE, TARGET_RATE * 2, 2, 16,
+        b"data", len(pcm16),
+    )
+    return header + pcm16
+
+
+def decode_wav(data: bytes) -> Optional[bytes]:
+    """WAV 업로드를 16kHz 모노 PCM16 WAV로 바꾼다. 빠른 경로로 처리할 수 없으면 None."""
+    parsed = _parse_chunks(data)
+    if parsed is None:
+        return None
+    audio_format, channels, rate, bits, samples = parsed
+    if channels < 1 or rate <= 0 or bits % 8:
+        return None
+    if audio_format == WAVE_FORMAT_PCM and channels == 1 and rate == TARGET_RATE and bits == 16:
+        usable = len(samples) - len(samples) % 2
+        return _wav_bytes(bytes(samples[:usable]))
+    if np is None:
+        return None
+    pcm = _to_float_mono(samples, audio_format, channels, bits)
+    if pcm is None:
+        return None
+    pcm = _resample(pcm, rate)
+    pcm16 = np.clip(np.rint(pcm * 32767.0), -32768, 32767).astype("<i2")
+    return _wav_bytes(pcm16.tobytes())
+
+
+class TrimResult(NamedTuple):
+    wav: Optional[bytes]  # 잘라낸 WAV. 음성이 없으면 None
+    original_seconds: float
+    kept_seconds: float
+
+
+def trim_silence(data: bytes) -> TrimResult:
+    """16kHz 모노 PCM16 WAV의 앞뒤 무음을 잘라낸다.
+
+    20ms 프레임별 RMS(dBFS)를 한 번에 계산하고, 하위 10% 프레임을 잡음 바닥으로 보아
+    그보다 VAD_MARGIN_DB 이상 크고 VAD_MIN_DBFS를 넘는 프레임을 음성으로 본다.
+    음성이 VAD_MIN_SPEECH_MS보다 짧으면 wav=None을 돌려준다. NumPy가 없거나 형식이 다르면 그대로 둔다.
+    """
+    parsed = _parse_chunks(data)
+    if parsed is None or np is None:
+        return TrimResult(data, 0.0, 0.0)
+    audio_format, channels, rate, bits, samples = parsed
+    if (audio_format, channels, rate, bits) != (WAVE_FORMAT_PCM, 1, TARGET_RATE, 16):
+        return TrimResult(data, 0.0, 0.0)
+    pcm = np.frombuffer(samples[:len(samples) - len(samples) % 2], dtype="<i2")
+    original = len(pcm) / rate
+    frame = rate * VAD_FRAME_MS // 1000
+    n_frames = len(pcm) // frame
+    if n_frames == 0:
+        return TrimResult(None, original, 0.0)
+    frames = pcm[:n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    # 제곱 평균은 행렬 곱(einsum)으로 계산하는 편이 (frames ** 2).mean(axis=1)보다 빠르다.
+    power = np.einsum("ij,ij->i", frames, frames) / frame
+    db = 10 * np.log10(power / (32768.0 ** 2) + 1e-12)
+    floor, peak = np.percentile(db, [10, 99])
+    # 클립 전체가 말소리라 하위 10%도 음성인 경우를 위해 최고 레벨 기준 문턱과 비교해 낮은 쪽을 쓴다.
+    threshold = max(VAD_MIN_DBFS, min(floor + VAD_MARGIN_DB, peak - 2 * VAD_MARGIN_DB))
+    voiced = np.flatnonzero(db > threshold)
+    if len(voiced) * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+        return TrimResult(None, original, 0.0)
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    start = max(0, voiced[0] - pad) * frame
+    end = min(len(pcm), (voiced[-1] + 1 + pad) * frame)
+    if start == 0 and end >= n_frames * frame:
+        return TrimResult(data, original, original)
+    return TrimResult(_wav_bytes(pcm[start:end].tobytes()), original, (end - start) / rate)
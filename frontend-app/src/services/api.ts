@@ -2,6 +2,9 @@
 
 const VOICE_API_BASE = 'http://127.0.0.1:8000/api';
 
+// 음성 대화 세션 id. 서버가 이전 대화를 이어서 답하도록 다음 요청에 함께 보냅니다.
+let voiceSessionId: string | null = null;
+
 /**
  * 음성 파일을 서버로 보내 텍스트로 변환(STT)하고 AI 응답까지 받습니다.
  * (service-voice/server.py의 /api/get-ai-response 엔드포인트 호출)
@@ -10,13 +13,16 @@ export async function getResponseFromAudio(audioBlob: Blob) {
   const formData = new FormData();
   // 백엔드에서 'audio'라는 이름으로 파일을 기대하므로 수정합니다.
   formData.append('audio', audioBlob, 'recording.webm');
+  if (voiceSessionId) formData.append('session_id', voiceSessionId);
 
   const response = await fetch(`${VOICE_API_BASE}/get-ai-response`, {
     method: 'POST',
     body: formData,
   });
   if (!response.ok) throw new Error('음성 인식에 실패했습니다.');
-  return response.json();
+  const result = await response.json();
+  voiceSessionId = result.session_id ?? null;
+  return result;
 }
 
 /**
@@ -98,6 +98,8 @@ function initializeSidebar() {
     let currentRecordId = '';
     let isRecording = false;
     let isProcessing = false;
+    // 음성 대화 세션: 서버가 이전 대화를 기억하도록 응답으로 받은 id를 다음 요청에 보냅니다.
+    let voiceSessionId = null;
     let currentAudioUrl = null;
     let authToken = null;
     let authUser = null;
@@ -576,6 +578,7 @@ function initializeSidebar() {
             const audioBlob = await (await fetch(audioDataUrl)).blob();
             const formData = new FormData();
             formData.append('audio', audioBlob, 'recording.webm');
+            if (voiceSessionId) formData.append('session_id', voiceSessionId);
 
             const response = await fetch(`${VOICE_API_SERVER}/api/get-ai-response`, {
                 method: 'POST',
@@ -586,6 +589,7 @@ function initializeSidebar() {
                 throw new Error(err.detail || `서버 오류: ${response.status}`);
             }
             const result = await response.json();
+            voiceSessionId = result.session_id || null;
             userTranscript.textContent = result.transcript;
             aiResponse.textContent = result.response_text;
 